@@ -0,0 +1,101 @@
+"""
+ytInitialData 提取与遍历的微基准测试
+
+用法:
+    python benchmarks/bench_initial_data.py [保存的页面.html ...]
+
+不提供页面时会生成一个包含 2000 个视频条目的模拟播放列表页面。
+对比旧实现（非贪婪 DOTALL 正则 + 递归收集 videoId）与
+youtube_api.initial_data 中的 raw_decode 提取和迭代遍历。
+"""
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_api.initial_data import extract_initial_data, iter_values
+
+
+def regex_extract(html):
+    """
+    旧实现：非贪婪 DOTALL 正则 + json.loads
+    """
+    match = re.search(r'var ytInitialData = ({.*?});', html, re.DOTALL)
+    return json.loads(match.group(1)) if match else None
+
+
+def recursive_find(data, target_key):
+    """
+    旧实现：递归遍历，每一层构建并合并新列表
+    """
+    values = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == target_key:
+                values.append(value)
+            values.extend(recursive_find(value, target_key))
+    elif isinstance(data, list):
+        for item in data:
+            values.extend(recursive_find(item, target_key))
+    return values
+
+
+def build_sample_page(video_count=2000):
+    """
+    生成模拟的播放列表页面，结构与真实页面的 playlistVideoRenderer 一致
+    """
+    items = []
+    for i in range(video_count):
+        items.append({
+            "playlistVideoRenderer": {
+                "videoId": f"vid{i:08d}",
+                "title": {"runs": [{"text": f"Sample video {i}"}]},
+                "lengthSeconds": str(60 + i),
+                "thumbnail": {"thumbnails": [{"url": f"https://i.ytimg.com/vi/vid{i:08d}/hqdefault.jpg", "width": 480, "height": 360}]},
+                "navigationEndpoint": {"watchEndpoint": {"videoId": f"vid{i:08d}", "index": i}},
+            }
+        })
+    data = {
+        "contents": {"twoColumnBrowseResultsRenderer": {"tabs": [{"tabRenderer": {"content": {
+            "sectionListRenderer": {"contents": [{"itemSectionRenderer": {"contents": [
+                {"playlistVideoListRenderer": {"contents": items}}
+            ]}}]}
+        }}}]}}
+    }
+    padding = "<script>var ytcfg = {};</script>" * 20000
+    return f"<html><head></head><body>{padding}<script>var ytInitialData = {json.dumps(data)};</script></body></html>"
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"  {label:<40} {seconds * 1000:10.2f} ms")
+
+
+def run(name, html, number=5):
+    print(f"{name} ({len(html) / 1024 / 1024:.2f} MB)")
+    bench("正则 + json.loads", lambda: regex_extract(html), number)
+    bench("raw_decode", lambda: extract_initial_data(html), number)
+    
+    data = extract_initial_data(html)
+    if data is None:
+        print("  未找到ytInitialData，跳过遍历测试")
+        return
+    bench("递归收集 videoId", lambda: recursive_find(data, "videoId"), number)
+    bench("迭代遍历 videoId", lambda: list(iter_values(data, "videoId")), number)
+    bench("迭代遍历 playlistVideoRenderer（不深入）", lambda: list(iter_values(data, "playlistVideoRenderer", descend=False)), number)
+
+
+def main(paths):
+    if not paths:
+        run("模拟播放列表页面", build_sample_page())
+        return
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            run(os.path.basename(path), f.read())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+"""
+长文本切分的基准测试
+
+用法:
+    python benchmarks/bench_text_splitter.py [字幕文本.txt ...]
+
+不提供文件时会生成约 4 MB 的模拟英文字幕和中文字幕，以及一个不含换行的超长段落。
+对比旧实现（字符串反复拼接、按字符数计量、不拆分超长段落）与
+llm.text_splitter.TextSplitter（列表拼接、按 token 计量、优先在句子边界切分）。
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import estimate_tokens
+from llm.text_splitter import TextSplitter
+
+
+def legacy_split(text, chunk_size):
+    """
+    旧实现：current_chunk += paragraph，按字符数计量
+    """
+    chunks = []
+    current_chunk = ""
+    
+    paragraphs = text.split("\n")
+    
+    for paragraph in paragraphs:
+        if len(current_chunk) + len(paragraph) + 1 < chunk_size:
+            current_chunk += paragraph + "\n"
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = paragraph + "\n"
+    
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    
+    return chunks
+
+
+def build_english_transcript(target_bytes=4 * 1024 * 1024):
+    """
+    生成模拟英文字幕，每行一句
+    """
+    line = "so today we are going to talk about how the scheduler decides which task runs next."
+    return "\n".join([line] * (target_bytes // (len(line) + 1)))
+
+
+def build_chinese_transcript(target_bytes=4 * 1024 * 1024):
+    """
+    生成模拟中文字幕，每行一句
+    """
+    line = "今天我们来聊一聊调度器是如何决定下一个运行的任务的。"
+    return "\n".join([line] * (target_bytes // (len(line.encode("utf-8")) + 1)))
+
+
+def build_single_paragraph(target_bytes=4 * 1024 * 1024):
+    """
+    生成不含换行的超长段落，模拟没有断行的自动字幕
+    """
+    sentence = "and then we move on to the next part of the talk "
+    return sentence * (target_bytes // len(sentence))
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"  {label:<40} {seconds * 1000:10.2f} ms")
+
+
+def describe(label, chunks):
+    tokens = [estimate_tokens(chunk) for chunk in chunks]
+    print(f"  {label:<40} {len(chunks):6d} 块, 最大 {max(tokens)} tokens, 最小 {min(tokens)} tokens")
+
+
+def run(name, text, chunk_tokens=1500, chunk_size=2000, number=3):
+    print(f"{name} ({len(text.encode('utf-8')) / 1024 / 1024:.2f} MB)")
+    splitter = TextSplitter(chunk_tokens)
+    bench(f"旧实现 (chunk_size={chunk_size} 字符)", lambda: legacy_split(text, chunk_size), number)
+    bench(f"TextSplitter (chunk_tokens={chunk_tokens})", lambda: splitter.split(text), number)
+    describe("旧实现", legacy_split(text, chunk_size))
+    describe("TextSplitter", splitter.split(text))
+
+
+def main(paths):
+    if not paths:
+        run("模拟英文字幕", build_english_transcript())
+        run("模拟中文字幕", build_chinese_transcript())
+        run("无换行的超长段落", build_single_paragraph())
+        return
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            run(os.path.basename(path), f.read())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
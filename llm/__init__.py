@@ -0,0 +1,10 @@
+# 大模型调用公共组件
+from .tokens import estimate_tokens
+from .rate_limiter import AdaptiveRateLimiter, get_rate_limiter
+from .providers import ProviderRegistry, get_provider_registry
+from .failover import HedgedCompletion, get_provider_health
+from .usage import UsageTracker, ContextThreadPoolExecutor, get_usage_tracker
+from .text_splitter import TextSplitter
+from .sqlite_store import SqliteLRUStore, normalize_text, text_hash
+
+__all__ = ['estimate_tokens', 'AdaptiveRateLimiter', 'get_rate_limiter', 'ProviderRegistry', 'get_provider_registry', 'HedgedCompletion', 'get_provider_health', 'UsageTracker', 'ContextThreadPoolExecutor', 'get_usage_tracker', 'TextSplitter', 'SqliteLRUStore', 'normalize_text', 'text_hash']
@@ -0,0 +1,429 @@
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from .providers import get_provider_registry
+from .usage import ContextThreadPoolExecutor, get_usage_tracker
+
+# 延迟直方图的桶上界（秒）：50ms 起按 1.25 倍递增到约 5 分钟
+_LATENCY_BUCKETS = [0.05 * 1.25 ** i for i in range(40)]
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """
+    线程安全的请求延迟直方图，按固定的指数分桶统计，用于估算延迟分位数
+    """
+    
+    def __init__(self):
+        self._counts = [0] * (len(_LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def record(self, seconds):
+        """
+        记录一次请求延迟
+        """
+        with self._lock:
+            self._counts[bisect.bisect_left(_LATENCY_BUCKETS, seconds)] += 1
+            self.count += 1
+    
+    def percentile(self, p):
+        """
+        估算延迟分位数
+        
+        参数:
+            p: 分位数，取值 0-1，例如 0.95
+        
+        返回:
+            float: 所在桶的上界（秒），没有样本时返回 None
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            target = p * self.count
+            cumulative = 0
+            for index, count in enumerate(self._counts):
+                cumulative += count
+                if cumulative >= target:
+                    break
+        return _LATENCY_BUCKETS[min(index, len(_LATENCY_BUCKETS) - 1)]
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后在一段时间内拒绝请求，之后放行一个试探请求
+    """
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        初始化熔断器
+        
+        参数:
+            failure_threshold: 触发熔断的连续失败次数
+            reset_timeout: 熔断后等待多少秒再放行试探请求
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """
+        判断是否允许发送请求，熔断超时后只放行一个试探请求
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+    
+    def record_success(self):
+        """
+        记录一次成功，关闭熔断器
+        """
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+    
+    def record_failure(self):
+        """
+        记录一次失败，试探请求失败或连续失败达到阈值时熔断
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"服务商连续失败 {self.failures} 次，暂停使用 {self.reset_timeout} 秒")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+    
+    def record_cancel(self):
+        """
+        记录一次被取消的请求，试探请求被取消时重新熔断，等待下一次试探
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ProviderHealth:
+    """
+    单个服务商的健康状况：延迟直方图和熔断器
+    """
+    
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.breaker = CircuitBreaker()
+    
+    def get_stats(self):
+        """
+        获取健康状况统计
+        
+        返回:
+            dict: 熔断状态、连续失败次数、请求数和 p50/p95/p99 延迟
+        """
+        return {
+            "state": self.breaker.state,
+            "failures": self.breaker.failures,
+            "count": self.latency.count,
+            "p50": self.latency.percentile(0.5),
+            "p95": self.latency.percentile(0.95),
+            "p99": self.latency.percentile(0.99)
+        }
+
+
+def _discard_response(response):
+    """
+    关闭未被采用的响应：流式响应会占用连接并继续生成计费的 token
+    """
+    close = getattr(response, "close", None)
+    if not callable(close):
+        return
+    result = close()
+    if asyncio.iscoroutine(result):
+        asyncio.ensure_future(result)
+
+
+def get_provider_health(name):
+    """
+    获取进程内共享的服务商健康状况，所有翻译器和摘要生成器共用
+    
+    参数:
+        name: 服务商名称
+    
+    返回:
+        ProviderHealth: 该服务商的健康状况
+    """
+    with _health_lock:
+        health = _health.get(name)
+        if health is None:
+            health = _health[name] = ProviderHealth()
+        return health
+
+
+class HedgedCompletion:
+    """
+    多服务商对冲请求
+    
+    先向首选服务商发送请求，超过其延迟分位数仍未返回时向下一个服务商发送相同请求，
+    采用最先返回的结果；请求失败时立即改用下一个服务商。熔断中的服务商会被跳过。
+    """
+    
+    def __init__(self, providers, registry=None, hedge_percentile=0.95, min_samples=20, default_hedge_delay=5.0, max_workers=8, usage_tracker=None):
+        """
+        初始化对冲请求
+        
+        参数:
+            providers: (服务商名称, API密钥) 列表，按优先级排列
+            registry: 服务商注册表，为 None 时使用共享注册表
+            hedge_percentile: 超过该延迟分位数后发送对冲请求
+            min_samples: 延迟样本少于该数量时使用 default_hedge_delay
+            default_hedge_delay: 样本不足时的对冲等待秒数
+            max_workers: 同步接口使用的线程数
+            usage_tracker: 用量统计 UsageTracker，为 None 时使用共享统计；对冲请求的每个副本都会计入
+        """
+        self.providers = list(providers)
+        self.registry = registry or get_provider_registry()
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.default_hedge_delay = default_hedge_delay
+        self.max_workers = max_workers
+        self.usage_tracker = usage_tracker or get_usage_tracker()
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+    
+    def _hedge_delay(self, name):
+        """
+        根据服务商的延迟直方图计算发送对冲请求前的等待时间
+        """
+        latency = get_provider_health(name).latency
+        if latency.count < self.min_samples:
+            return self.default_hedge_delay
+        return latency.percentile(self.hedge_percentile)
+    
+    def _iter_available(self):
+        """
+        按优先级依次返回未熔断的服务商
+        """
+        for name, api_key in self.providers:
+            if get_provider_health(name).breaker.allow():
+                yield name, api_key
+    
+    def _record(self, key, count=1):
+        """
+        累加统计计数
+        """
+        with self._lock:
+            self.stats[key] += count
+    
+    def _discard_when_done(self, name, stage, stream, future):
+        """
+        未被采用的请求完成后关闭其响应，失败或被取消的请求无需处理
+        
+        流式响应的用量由读取响应的调用方记录，未被采用的流式副本不会被读取，在此记为一次取消的调用。
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        _discard_response(future.result())
+        if stream:
+            self.usage_tracker.record(stage, name, self.registry.get_model_name(name), cancelled=True)
+    
+    def _call(self, name, api_key, messages, stage, kwargs):
+        """
+        向单个服务商发送同步请求并记录延迟和成败
+        """
+        health = get_provider_health(name)
+        client = self.registry.get_client(name, api_key)
+        model = self.registry.get_model_name(name)
+        start = time.monotonic()
+        try:
+            response = self.usage_tracker.track(
+                stage, name, model,
+                lambda: client.chat.completions.create(model=model, messages=messages, **kwargs),
+                kwargs.get("stream", False)
+            )
+        except Exception:
+            health.breaker.record_failure()
+            raise
+        health.latency.record(time.monotonic() - start)
+        health.breaker.record_success()
+        return response
+    
+    async def _acall(self, name, api_key, messages, stage, kwargs):
+        """
+        向单个服务商发送异步请求并记录延迟和成败
+        """
+        health = get_provider_health(name)
+        client = self.registry.get_async_client(name, api_key)
+        model = self.registry.get_model_name(name)
+        start = time.monotonic()
+        try:
+            response = await self.usage_tracker.atrack(
+                stage, name, model,
+                lambda: client.chat.completions.create(model=model, messages=messages, **kwargs),
+                kwargs.get("stream", False)
+            )
+        except asyncio.CancelledError:
+            # 对冲请求中落后的副本会被取消，不计为失败，但试探请求被取消时要重新熔断
+            health.breaker.record_cancel()
+            raise
+        except Exception:
+            health.breaker.record_failure()
+            raise
+        health.latency.record(time.monotonic() - start)
+        health.breaker.record_success()
+        return response
+    
+    def create(self, messages, stage=None, **kwargs):
+        """
+        发送对话请求（同步接口），返回最先成功的响应
+        
+        其余在途请求不会被中断，完成后关闭其响应，流式响应不再继续生成。
+        
+        参数:
+            messages: 对话消息列表
+            stage: 用量统计中的调用阶段
+            **kwargs: 传给 chat.completions.create 的其他参数
+        
+        返回:
+            tuple: (服务商名称, 响应)，为最先成功的服务商；全部失败时抛出最后一次的异常
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ContextThreadPoolExecutor(max_workers=self.max_workers)
+        self._record("requests")
+        
+        candidates = self._iter_available()
+        pending = {}
+        last_error = None
+        
+        def start_next():
+            for name, api_key in candidates:
+                future = self._executor.submit(self._call, name, api_key, messages, stage, kwargs)
+                pending[future] = name
+                return name
+            return None
+        
+        current = first = start_next()
+        if current is None:
+            raise RuntimeError("所有服务商均处于熔断状态")
+        
+        while pending:
+            done, _ = wait(pending, timeout=self._hedge_delay(current), return_when=FIRST_COMPLETED)
+            if not done:
+                # 超过延迟分位数仍未返回，向下一个服务商发送对冲请求
+                hedged = start_next()
+                if hedged:
+                    self._record("hedges")
+                    current = hedged
+                continue
+            
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    print(f"服务商 {name} 请求失败: {e}")
+                    last_error = e
+                    continue
+                if name != first and pending:
+                    self._record("hedge_wins")
+                for other, other_name in pending.items():
+                    other.add_done_callback(functools.partial(self._discard_when_done, other_name, stage, kwargs.get("stream", False)))
+                return name, response
+            
+            if not pending:
+                # 所有在途请求都失败，改用下一个服务商
+                failover = start_next()
+                if failover:
+                    self._record("failovers")
+                    current = failover
+        
+        raise last_error
+    
+    async def acreate(self, messages, stage=None, **kwargs):
+        """
+        发送对话请求（协程版本），返回最先成功的响应，其余在途请求会被取消
+        
+        参数:
+            messages: 对话消息列表
+            stage: 用量统计中的调用阶段
+            **kwargs: 传给 chat.completions.create 的其他参数
+        
+        返回:
+            tuple: (服务商名称, 响应)，为最先成功的服务商；全部失败时抛出最后一次的异常
+        """
+        self._record("requests")
+        
+        candidates = self._iter_available()
+        pending = {}
+        last_error = None
+        
+        def start_next():
+            for name, api_key in candidates:
+                task = asyncio.ensure_future(self._acall(name, api_key, messages, stage, kwargs))
+                pending[task] = name
+                return name
+            return None
+        
+        current = first = start_next()
+        if current is None:
+            raise RuntimeError("所有服务商均处于熔断状态")
+        
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=self._hedge_delay(current), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = start_next()
+                    if hedged:
+                        self._record("hedges")
+                        current = hedged
+                    continue
+                
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        print(f"服务商 {name} 请求失败: {e}")
+                        last_error = e
+                        continue
+                    if name != first and pending:
+                        self._record("hedge_wins")
+                    return name, response
+                
+                if not pending:
+                    failover = start_next()
+                    if failover:
+                        self._record("failovers")
+                        current = failover
+        finally:
+            for task, task_name in pending.items():
+                # 与胜出请求同时完成的副本无法取消，关闭其响应
+                task.add_done_callback(functools.partial(self._discard_when_done, task_name, stage, kwargs.get("stream", False)))
+                task.cancel()
+        
+        raise last_error
+    
+    def get_stats(self):
+        """
+        获取对冲统计和各服务商的健康状况
+        
+        返回:
+            dict: 请求数、对冲次数、对冲请求先于原请求返回的次数、失败切换次数，以及 providers 下各服务商的健康状况
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats["providers"] = {name: get_provider_health(name).get_stats() for name, _ in self.providers}
+        return stats
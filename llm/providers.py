@@ -0,0 +1,211 @@
+import asyncio
+import contextvars
+import threading
+import httpx
+import openai
+
+# h2 为可选依赖，安装后启用 HTTP/2
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 内置服务商：OpenAI 兼容接口地址和默认模型
+DEFAULT_PROVIDERS = {
+    "dashscope": {
+        "base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1",  # 阿里云百炼
+        "model": "qwen-plus"
+    },
+    "qiniu": {
+        "base_url": "https://api.qnaigc.com/v1",  # 七牛云
+        "model": "qwen-turbo"
+    }
+}
+
+# 未知服务商使用的默认模型
+DEFAULT_MODEL = "qwen-plus"
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+class ProviderRegistry:
+    """
+    大模型服务商注册表，为每个 (服务商, API密钥) 提供一个长期复用的客户端
+    
+    同一服务商的翻译器和摘要生成器共用客户端及其 HTTP 连接池，
+    异步客户端统一运行在注册表的后台事件循环上，保证连接池可以跨调用复用。
+    """
+    
+    def __init__(self, timeout=60.0, connect_timeout=10.0, max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0, http2=True):
+        """
+        初始化服务商注册表
+        
+        参数:
+            timeout: 读写超时时间（秒）
+            connect_timeout: 建立连接的超时时间（秒）
+            max_connections: 每个客户端的最大连接数
+            max_keepalive_connections: 每个客户端保持的最大空闲连接数
+            keepalive_expiry: 空闲连接保持的秒数
+            http2: 是否启用 HTTP/2，未安装 h2 时自动退回 HTTP/1.1
+        """
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._providers = {name: dict(config) for name, config in DEFAULT_PROVIDERS.items()}
+        self._clients = {}
+        self._async_clients = {}
+        self._lock = threading.Lock()
+        self._loop = None
+    
+    def register(self, name, base_url, model=DEFAULT_MODEL):
+        """
+        注册 OpenAI 兼容的服务商，同名时覆盖，例如指向本地推理服务用于测试
+        
+        参数:
+            name: 服务商名称
+            base_url: 接口地址，例如 "http://localhost:8000/v1"
+            model: 该服务商使用的模型名称
+        """
+        with self._lock:
+            self._providers[name] = {"base_url": base_url, "model": model}
+            # 丢弃按旧地址创建的客户端
+            stale = [self._clients.pop(key) for key in [key for key in self._clients if key[0] == name]]
+            stale_async = [self._async_clients.pop(key) for key in [key for key in self._async_clients if key[0] == name]]
+        
+        # 关闭旧客户端，释放其连接池
+        for client in stale:
+            client.close()
+        if stale_async and self._loop is not None:
+            for client in stale_async:
+                asyncio.run_coroutine_threadsafe(client.close(), self._loop)
+    
+    def get_providers(self):
+        """
+        获取已注册的服务商名称列表
+        """
+        with self._lock:
+            return list(self._providers)
+    
+    def get_model_name(self, name):
+        """
+        获取服务商使用的模型名称，未注册的服务商返回默认模型
+        """
+        with self._lock:
+            config = self._providers.get(name)
+        return config["model"] if config else DEFAULT_MODEL
+    
+    def _get_config(self, name):
+        """
+        获取服务商配置，未注册时抛出 ValueError
+        """
+        config = self._providers.get(name)
+        if config is None:
+            raise ValueError(f"未注册的服务商: {name}")
+        return config
+    
+    def get_client(self, name, api_key):
+        """
+        获取同步客户端，同一 (服务商, API密钥) 始终返回同一个实例
+        
+        参数:
+            name: 服务商名称
+            api_key: API密钥
+        
+        返回:
+            openai.OpenAI: 共享连接池的客户端
+        """
+        with self._lock:
+            client = self._clients.get((name, api_key))
+            if client is None:
+                config = self._get_config(name)
+                client = self._clients[(name, api_key)] = openai.OpenAI(
+                    api_key=api_key,
+                    base_url=config["base_url"],
+                    max_retries=0,  # 429 和重试由共享限速器统一处理
+                    timeout=self.timeout,
+                    http_client=httpx.Client(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                )
+            return client
+    
+    def get_async_client(self, name, api_key):
+        """
+        获取异步客户端，同一 (服务商, API密钥) 始终返回同一个实例
+        
+        异步客户端只能在 run 使用的后台事件循环中调用。
+        
+        参数:
+            name: 服务商名称
+            api_key: API密钥
+        
+        返回:
+            openai.AsyncOpenAI: 共享连接池的异步客户端
+        """
+        with self._lock:
+            client = self._async_clients.get((name, api_key))
+            if client is None:
+                config = self._get_config(name)
+                client = self._async_clients[(name, api_key)] = openai.AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=config["base_url"],
+                    max_retries=0,  # 429 和重试由共享限速器统一处理
+                    timeout=self.timeout,
+                    http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                )
+            return client
+    
+    def run(self, coro):
+        """
+        在后台事件循环线程中执行协程并等待结果
+        
+        异步客户端的连接池绑定在事件循环上，所有同步调用共用同一个循环才能复用连接。
+        协程在调用线程的上下文中执行，用量统计所属的视频等上下文变量随之传递。
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(_run_in_context(coro, contextvars.copy_context()), self._loop).result()
+    
+    def close(self):
+        """
+        关闭所有客户端及其连接池
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            async_clients = list(self._async_clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+        for client in clients:
+            client.close()
+        if async_clients and self._loop is not None:
+            for client in async_clients:
+                asyncio.run_coroutine_threadsafe(client.close(), self._loop).result()
+
+
+async def _run_in_context(coro, context):
+    """
+    将调用线程的上下文变量复制到当前任务后执行协程
+    """
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def get_provider_registry():
+    """
+    获取进程内共享的服务商注册表
+    
+    返回:
+        ProviderRegistry: 共享的注册表
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ProviderRegistry()
+        return _default_registry
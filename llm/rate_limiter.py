@@ -0,0 +1,382 @@
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# 并发已满时重新检查的间隔（秒）
+_POLL_INTERVAL = 0.05
+
+# 形如 "1s"、"6m0s"、"20ms" 的重置时间
+_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _parse_duration(value):
+    """
+    解析 Retry-After 或限流重置时间，返回秒数，无法解析时返回 None
+    """
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    parts = _DURATION_PATTERN.findall(value)
+    if parts:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    
+    # Retry-After 也可以是 HTTP 日期
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_retry_delay(headers):
+    """
+    从 429 响应头中读取需要等待的秒数
+    
+    依次识别 retry-after-ms、Retry-After，以及剩余额度为 0 时的 x-ratelimit-reset-requests/tokens。
+    
+    参数:
+        headers: 响应头，支持 dict 或 httpx.Headers
+    
+    返回:
+        float: 需要等待的秒数，响应头中没有相关信息时返回 None
+    """
+    if not headers:
+        return None
+    
+    delays = []
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        delay = _parse_duration(retry_after_ms)
+        if delay is not None:
+            delays.append(delay / 1000)
+    
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        delays.append(_parse_duration(retry_after))
+    
+    for kind in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+        reset = headers.get(f"x-ratelimit-reset-{kind}")
+        if reset is not None and remaining is not None and str(remaining).strip() == "0":
+            delays.append(_parse_duration(reset))
+    
+    delays = [delay for delay in delays if delay is not None]
+    return max(delays) if delays else None
+
+
+def _get_status_and_headers(error):
+    """
+    从 SDK 异常中取出 HTTP 状态码和响应头
+    """
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None)
+    return status_code, headers
+
+
+class AdaptiveRateLimiter:
+    """
+    大模型请求的自适应限速器，线程和协程均可使用
+    
+    同时限制每分钟请求数、每分钟 token 数和在途请求数。
+    收到 429 时按 Retry-After 等限流响应头暂停所有调用方，并将并发上限减半；
+    请求成功时并发上限缓慢回升（AIMD）。
+    """
+    
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=8, min_concurrency=1, default_backoff=2.0):
+        """
+        初始化限速器
+        
+        参数:
+            requests_per_minute: 每分钟最大请求数，为 None 时不限制
+            tokens_per_minute: 每分钟最大 token 数（估算值），为 None 时不限制
+            max_concurrency: 在途请求数上限
+            min_concurrency: 收到限流后并发上限最低降到的值
+            default_backoff: 429 响应中没有等待时间时暂停的秒数
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.default_backoff = default_backoff
+        self._concurrency = float(max_concurrency)
+        self._in_flight = 0
+        self._events = deque()  # (时间戳, token 数)
+        self._tokens_in_window = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self.stats = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "cancelled": 0,
+            "throttled": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0
+        }
+    
+    def configure(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=None):
+        """
+        更新限速配置，参数为 None 时保持原值
+        """
+        with self._condition:
+            if requests_per_minute is not None:
+                self.requests_per_minute = requests_per_minute
+            if tokens_per_minute is not None:
+                self.tokens_per_minute = tokens_per_minute
+            if max_concurrency is not None:
+                self.max_concurrency = max_concurrency
+                self._concurrency = min(self._concurrency, float(max_concurrency))
+            self._condition.notify_all()
+    
+    def _try_acquire(self, tokens):
+        """
+        尝试占用一个请求名额，调用方需持有锁
+        
+        返回:
+            float: 0 表示已占用，否则为建议等待的秒数
+        """
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= max(self.min_concurrency, int(self._concurrency)):
+            return _POLL_INTERVAL
+        
+        while self._events and now - self._events[0][0] >= 60:
+            self._tokens_in_window -= self._events.popleft()[1]
+        
+        requests_ok = not self.requests_per_minute or len(self._events) < self.requests_per_minute
+        # 单个请求超过整个 token 预算时，只要窗口为空就放行，避免永久等待
+        tokens_ok = (
+            not self.tokens_per_minute
+            or self._tokens_in_window + tokens <= self.tokens_per_minute
+            or not self._events
+        )
+        if not (requests_ok and tokens_ok):
+            # 等待窗口中最早的请求过期
+            return 60 - (now - self._events[0][0])
+        
+        if self.requests_per_minute or self.tokens_per_minute:
+            self._events.append((now, tokens))
+            self._tokens_in_window += tokens
+        self._in_flight += 1
+        self.stats["requests"] += 1
+        return 0
+    
+    def _record_wait(self, waited):
+        """
+        记录一次因额度不足而发生的等待
+        """
+        if waited <= 0:
+            return
+        with self._condition:
+            self.stats["waits"] += 1
+            self.stats["wait_seconds"] += waited
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+    
+    def acquire(self, tokens=0):
+        """
+        占用一个请求名额，额度不足时阻塞等待
+        
+        参数:
+            tokens: 本次请求预计消耗的 token 数
+        
+        返回:
+            float: 实际等待的秒数
+        """
+        start = time.monotonic()
+        with self._condition:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return 0.0
+            while wait > 0:
+                self._condition.wait(wait)
+                wait = self._try_acquire(tokens)
+        waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+    
+    async def aacquire(self, tokens=0):
+        """
+        占用一个请求名额（协程版本），等待时不阻塞事件循环
+        
+        参数:
+            tokens: 本次请求预计消耗的 token 数
+        
+        返回:
+            float: 实际等待的秒数
+        """
+        start = time.monotonic()
+        waited = 0.0
+        while True:
+            with self._condition:
+                wait = self._try_acquire(tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+    
+    def release(self, success=True, cancelled=False):
+        """
+        释放请求名额，请求成功时并发上限加性增长
+        
+        参数:
+            success: 请求是否成功
+            cancelled: 请求是否被调用方取消，取消的请求不影响并发上限
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if cancelled:
+                self.stats["cancelled"] += 1
+            elif success:
+                self.stats["successes"] += 1
+                self._concurrency = min(float(self.max_concurrency), self._concurrency + 1 / self._concurrency)
+            else:
+                self.stats["failures"] += 1
+            self._condition.notify_all()
+    
+    def throttle(self, headers=None):
+        """
+        释放请求名额并记录一次限流：按响应头暂停所有调用方，并发上限减半
+        
+        同一秒内的多次限流只减半一次，避免一批并发请求同时被拒后并发上限降到底。
+        
+        参数:
+            headers: 429 响应的响应头
+        
+        返回:
+            float: 暂停的秒数
+        """
+        delay = parse_retry_delay(headers)
+        if delay is None:
+            delay = self.default_backoff
+        
+        with self._condition:
+            now = time.monotonic()
+            self._in_flight -= 1
+            self.stats["throttled"] += 1
+            self._blocked_until = max(self._blocked_until, now + delay)
+            if now - self._last_decrease >= 1:
+                self._concurrency = max(float(self.min_concurrency), self._concurrency / 2)
+                self._last_decrease = now
+            self._condition.notify_all()
+        return delay
+    
+    def _finish_failed(self, error):
+        """
+        根据异常释放名额，返回是否为限流错误
+        """
+        status_code, headers = _get_status_and_headers(error)
+        if status_code == 429:
+            self.throttle(headers)
+            return True
+        self.release(success=False)
+        return False
+    
+    def call(self, func, tokens=0, max_retries=3, error_message="请求失败", hold=False):
+        """
+        在限速下调用 func，失败时重试
+        
+        429 错误由限速器统一暂停后重试，其他错误按指数退避重试。
+        
+        参数:
+            func: 发送请求的无参数调用
+            tokens: 本次请求预计消耗的 token 数
+            max_retries: 最大尝试次数
+            error_message: 失败时打印的提示
+            hold: 为 True 时成功后不释放名额，由调用方在读完响应后调用 release，用于流式响应
+        
+        返回:
+            func 的返回值，重试耗尽后抛出最后一次的异常
+        """
+        for attempt in range(max_retries):
+            self.acquire(tokens)
+            try:
+                result = func()
+            except Exception as e:
+                throttled = self._finish_failed(e)
+                print(f"{error_message} (尝试 {attempt+1}/{max_retries}): {e}")
+                if attempt >= max_retries - 1:
+                    raise
+                if not throttled:
+                    time.sleep(2 ** (attempt + 1))  # 指数退避
+            else:
+                if not hold:
+                    self.release(success=True)
+                return result
+    
+    async def acall(self, make_coro, tokens=0, max_retries=3, error_message="请求失败"):
+        """
+        在限速下执行协程，失败时重试（协程版本）
+        
+        参数:
+            make_coro: 每次调用返回一个新协程的函数
+            tokens: 本次请求预计消耗的 token 数
+            max_retries: 最大尝试次数
+            error_message: 失败时打印的提示
+        
+        返回:
+            协程的返回值，重试耗尽后抛出最后一次的异常
+        """
+        for attempt in range(max_retries):
+            await self.aacquire(tokens)
+            try:
+                result = await make_coro()
+            except Exception as e:
+                throttled = self._finish_failed(e)
+                print(f"{error_message} (尝试 {attempt+1}/{max_retries}): {e}")
+                if attempt >= max_retries - 1:
+                    raise
+                if not throttled:
+                    await asyncio.sleep(2 ** (attempt + 1))  # 指数退避
+            else:
+                self.release(success=True)
+                return result
+    
+    def get_stats(self):
+        """
+        获取限速统计信息
+        
+        返回:
+            dict: 请求、成功、失败、取消、限流、等待次数和等待时长，以及当前并发上限、在途请求数和剩余暂停时间
+        """
+        with self._condition:
+            stats = dict(self.stats)
+            stats["concurrency"] = max(self.min_concurrency, int(self._concurrency))
+            stats["in_flight"] = self._in_flight
+            stats["blocked_seconds"] = max(0.0, self._blocked_until - time.monotonic())
+        return stats
+
+
+def get_rate_limiter(name="default", requests_per_minute=None, tokens_per_minute=None, max_concurrency=None):
+    """
+    获取进程内共享的限速器，同一服务商的所有翻译和摘要请求共用一个
+    
+    参数:
+        name: 限速器名称，通常为服务商名称
+        requests_per_minute: 每分钟最大请求数，不为 None 时更新配置
+        tokens_per_minute: 每分钟最大 token 数，不为 None 时更新配置
+        max_concurrency: 在途请求数上限，不为 None 时更新配置
+    
+    返回:
+        AdaptiveRateLimiter: 共享的限速器
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = AdaptiveRateLimiter()
+    limiter.configure(requests_per_minute, tokens_per_minute, max_concurrency)
+    return limiter
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def normalize_text(text):
+    """
+    规范化文本：去除首尾空白，合并每行内的连续空白，保留换行
+    
+    多行文本（长文本分块、字幕块）的译文按行对应，换行不同的文本不能共用同一条缓存。
+    """
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines())
+
+
+def text_hash(text):
+    """
+    计算规范化文本的 sha256 哈希，作为缓存键
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class SqliteLRUStore:
+    """
+    基于 sqlite 的键值存储，按条目数限制容量，超出后淘汰最久未访问的条目
+    
+    翻译记忆、摘要缓存等大模型结果缓存共用，统一维护条目数、访问时间和命中统计。
+    每行由若干键列和值列组成，另有 created_at、accessed_at 两列记录写入和访问时间。
+    """
+    
+    def __init__(self, path, table, key_columns, value_columns, max_entries):
+        """
+        初始化存储
+        
+        参数:
+            path: sqlite 数据库文件路径
+            table: 表名
+            key_columns: 键列 [(列名, 类型)]，共同构成主键
+            value_columns: 值列 [(列名, 类型)]
+            max_entries: 最大条目数，超出后按最近访问时间淘汰
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.table = table
+        self.key_names = [name for name, _ in key_columns]
+        self.value_names = [name for name, _ in value_columns]
+        self.max_entries = max_entries
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0
+        }
+        
+        columns = ", ".join(f"{name} {column_type} NOT NULL" for name, column_type in key_columns + value_columns)
+        self._key_condition = " AND ".join(f"{name} = ?" for name in self.key_names)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ({columns}, created_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+            f"PRIMARY KEY ({', '.join(self.key_names)}))"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed_at)")
+        self._conn.commit()
+        self._count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    
+    def get_many(self, keys):
+        """
+        批量查询，命中的条目更新访问时间
+        
+        参数:
+            keys: 键元组列表，元素顺序与 key_columns 一致
+        
+        返回:
+            dict: 下标 -> 值元组，只包含命中的条目
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            for index, key in enumerate(keys):
+                row = self._conn.execute(
+                    f"SELECT {', '.join(self.value_names)} FROM {self.table} WHERE {self._key_condition}",
+                    key
+                ).fetchone()
+                if row is None:
+                    self.stats["misses"] += 1
+                    continue
+                self.stats["hits"] += 1
+                found[index] = row
+                self._conn.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE {self._key_condition}",
+                    (now,) + tuple(key)
+                )
+            if found:
+                self._conn.commit()
+        return found
+    
+    def get(self, key):
+        """
+        查询单个键
+        
+        返回:
+            tuple: 值元组，未命中时返回 None
+        """
+        return self.get_many([key]).get(0)
+    
+    def put_many(self, rows):
+        """
+        批量写入，已存在的键会被覆盖，超出容量时淘汰最久未访问的条目
+        
+        参数:
+            rows: 行元组列表，依次为各键列和各值列
+        """
+        if not rows:
+            return
+        now = time.time()
+        key_length = len(self.key_names)
+        columns = self.key_names + self.value_names + ["created_at", "accessed_at"]
+        with self._lock:
+            for row in rows:
+                row = tuple(row)
+                exists = self._conn.execute(
+                    f"SELECT 1 FROM {self.table} WHERE {self._key_condition}",
+                    row[:key_length]
+                ).fetchone()
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    row + (now, now)
+                )
+                if not exists:
+                    self._count += 1
+            self.stats["writes"] += len(rows)
+            
+            overflow = self._count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN (SELECT rowid FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self._count -= overflow
+                self.stats["evictions"] += overflow
+            self._conn.commit()
+    
+    def select(self, columns):
+        """
+        读取所有条目的指定列，用于导出
+        
+        参数:
+            columns: 列名列表
+        
+        返回:
+            list: 行元组列表
+        """
+        with self._lock:
+            return self._conn.execute(f"SELECT {', '.join(columns)} FROM {self.table}").fetchall()
+    
+    def clear(self):
+        """
+        清空所有条目
+        """
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._count = 0
+    
+    def get_stats(self):
+        """
+        获取统计信息
+        
+        返回:
+            dict: 命中、未命中、写入、淘汰次数，当前条目数和命中率
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = self._count
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+    
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
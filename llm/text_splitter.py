@@ -0,0 +1,102 @@
+import re
+from .tokens import estimate_tokens
+
+# 句末标点之后切分：中文句末标点直接切分，英文句末标点需后接空白
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[。！？；!?;])|(?<=[.…])(?=\s)')
+
+
+class TextSplitter:
+    """
+    按 token 预算切分文本，线性时间
+    
+    优先在段落边界切分；单个段落超出预算时按句子切分，单个句子仍超出时按长度截断，
+    尽量截断在空格处。
+    每块由片段列表一次性拼接，token 数只按片段计算一次。
+    """
+    
+    def __init__(self, chunk_tokens=1500, token_counter=None):
+        """
+        初始化文本切分器
+        
+        参数:
+            chunk_tokens: 每块的最大 token 数
+            token_counter: 计算文本 token 数的函数，例如模型分词器，默认使用 estimate_tokens 估算
+        """
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.token_counter = token_counter or estimate_tokens
+    
+    def split(self, text):
+        """
+        将文本切分为不超过 token 预算的块
+        
+        参数:
+            text: 要切分的文本，段落之间以换行分隔
+        
+        返回:
+            list: 分块后的文本列表
+        """
+        chunks = []
+        current = []
+        current_tokens = 0
+        
+        for paragraph in text.split("\n"):
+            if not paragraph.strip():
+                continue
+            paragraph_tokens = self.token_counter(paragraph) + 1  # 换行符
+            if paragraph_tokens <= self.chunk_tokens:
+                pieces = [(paragraph + "\n", paragraph_tokens)]
+            else:
+                pieces = self._split_oversized(paragraph)
+                pieces[-1] = (pieces[-1][0] + "\n", pieces[-1][1] + 1)
+            
+            for piece, piece_tokens in pieces:
+                if current and current_tokens + piece_tokens > self.chunk_tokens:
+                    chunks.append("".join(current).strip())
+                    current = []
+                    current_tokens = 0
+                current.append(piece)
+                current_tokens += piece_tokens
+        
+        if current:
+            chunks.append("".join(current).strip())
+        return chunks
+    
+    def _split_oversized(self, paragraph):
+        """
+        将超出预算的段落按句子切分，单个句子仍超出预算时按长度截断
+        
+        返回:
+            list: (片段, token 数) 列表
+        """
+        pieces = []
+        for sentence in _SENTENCE_BOUNDARY.split(paragraph):
+            if not sentence:
+                continue
+            sentence_tokens = self.token_counter(sentence)
+            if sentence_tokens <= self.chunk_tokens:
+                pieces.append((sentence, sentence_tokens))
+            else:
+                pieces.extend(self._split_by_length(sentence, sentence_tokens))
+        return pieces
+    
+    def _split_by_length(self, text, tokens):
+        """
+        按 token 密度估算每段的字符数截断文本，尽量在空格处截断，避免切开英文单词
+        
+        返回:
+            list: (片段, token 数) 列表
+        """
+        # 预留一成余量，抵消文本各处 token 密度的差异
+        step = max(1, int(len(text) * self.chunk_tokens / tokens * 0.9))
+        pieces = []
+        start = 0
+        while start < len(text):
+            end = min(len(text), start + step)
+            if end < len(text):
+                space = text.rfind(" ", start + 1, end)
+                if space > start:
+                    end = space + 1
+            part = text[start:end]
+            pieces.append((part, self.token_counter(part)))
+            start = end
+        return pieces
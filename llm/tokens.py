@@ -0,0 +1,26 @@
+import math
+import re
+
+# 中日韩字符（含全角标点），通常每个字符约占一个 token
+_CJK_PATTERN = re.compile(r'[　-〿぀-ヿ㐀-䶿一-鿿가-힯＀-￯]')
+
+
+def estimate_tokens(text):
+    """
+    估算文本的 token 数量
+    
+    不依赖具体模型的分词器：中日韩字符按每字 1 个 token 计，
+    其他字符按每 4 个字符 1 个 token 计，结果偏保守。
+    
+    参数:
+        text: 要估算的文本
+        
+    返回:
+        int: 估算的 token 数
+    """
+    if not text:
+        return 0
+    # 删除中日韩字符后比较长度，比 findall 构建列表更快
+    cjk_count = len(text) - len(_CJK_PATTERN.sub("", text))
+    other_count = len(text) - cjk_count
+    return cjk_count + math.ceil(other_count / 4)
@@ -0,0 +1,297 @@
+import asyncio
+import contextvars
+import csv
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 导出 CSV 时的列顺序
+RECORD_FIELDS = [
+    "timestamp", "video_id", "stage", "provider", "model",
+    "prompt_tokens", "completion_tokens", "total_tokens", "latency", "success", "cancelled", "error"
+]
+
+# 内置服务商默认模型的参考单价（元/千 token）：(输入, 输出)
+DEFAULT_PRICES = {
+    "qwen-plus": (0.0008, 0.002),
+    "qwen-turbo": (0.0003, 0.0006)
+}
+
+# 当前上下文所属的 (UsageTracker, 视频ID)，提交到线程池或事件循环的调用沿用提交时的视频
+_current_video = contextvars.ContextVar("usage_current_video", default=None)
+
+_default_tracker = None
+_default_tracker_lock = threading.Lock()
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    提交任务时复制当前上下文的线程池，任务中的大模型调用计入提交时所属的视频
+    """
+    
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class UsageTracker:
+    """
+    大模型调用的用量统计：记录每次调用的 token 数、耗时、服务商和模型，
+    按视频、阶段和服务商汇总，并可导出为 JSON 或 CSV
+    """
+    
+    def __init__(self, prices=None):
+        """
+        初始化用量统计
+        
+        参数:
+            prices: 模型单价 {模型名称: (输入每千 token 价格, 输出每千 token 价格)}，为 None 时使用 DEFAULT_PRICES，
+                    没有单价的模型不计算费用
+        """
+        self.prices = DEFAULT_PRICES if prices is None else prices
+        self.records = []
+        self.video_id = None
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+    
+    def begin_video(self, video_id):
+        """
+        开始处理一个视频，当前线程之后的调用都计入该视频，直到下一次调用 begin_video
+        
+        之前提交到 ContextThreadPoolExecutor 或异步客户端、尚未完成的调用仍计入提交时的视频。
+        
+        参数:
+            video_id: 视频ID，为 None 时不归属任何视频
+        """
+        with self._lock:
+            self.video_id = video_id
+        _current_video.set((self, video_id))
+    
+    def _get_video_id(self):
+        """
+        获取当前上下文所属的视频，没有绑定到本统计对象时使用最近一次 begin_video 的视频
+        """
+        current = _current_video.get()
+        if current is not None and current[0] is self:
+            return current[1]
+        return self.video_id
+    
+    def record(self, stage, provider, model, prompt_tokens=0, completion_tokens=0, latency=0.0, error=None, cancelled=False):
+        """
+        记录一次调用
+        
+        参数:
+            stage: 调用阶段，例如 "translate"、"summarize"
+            provider: 服务商名称
+            model: 模型名称
+            prompt_tokens: 输入 token 数
+            completion_tokens: 输出 token 数
+            latency: 耗时（秒）
+            error: 调用失败时的异常，成功时为 None
+            cancelled: 调用是否被取消，例如对冲请求中落后的副本
+        """
+        video_id = self._get_video_id()
+        with self._lock:
+            self.records.append({
+                "timestamp": time.time(),
+                "video_id": video_id,
+                "stage": stage,
+                "provider": provider,
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "latency": latency,
+                "success": error is None and not cancelled,
+                "cancelled": cancelled,
+                "error": (str(error) or type(error).__name__) if error is not None else ""
+            })
+    
+    def record_response(self, stage, provider, model, response, latency):
+        """
+        从接口响应的 usage 中读取 token 数并记录一次成功的调用
+        
+        参数:
+            stage: 调用阶段
+            provider: 服务商名称
+            model: 模型名称
+            response: chat.completions.create 的返回值
+            latency: 耗时（秒）
+        """
+        usage = getattr(response, "usage", None)
+        self.record(
+            stage, provider, model,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            latency=latency
+        )
+    
+    def track(self, stage, provider, model, func, stream=False):
+        """
+        调用 func 发送请求，记录耗时、token 数和失败
+        
+        流式请求的 token 数要读完整个响应后才知道，由调用方自行记录。
+        
+        参数:
+            stage: 调用阶段
+            provider: 服务商名称
+            model: 模型名称
+            func: 发送请求的无参数调用
+            stream: 是否为流式请求
+        
+        返回:
+            func 的返回值
+        """
+        start = time.monotonic()
+        try:
+            response = func()
+        except Exception as e:
+            self.record(stage, provider, model, latency=time.monotonic() - start, error=e)
+            raise
+        if not stream:
+            self.record_response(stage, provider, model, response, time.monotonic() - start)
+        return response
+    
+    async def atrack(self, stage, provider, model, make_coro, stream=False):
+        """
+        执行协程发送请求，记录耗时、token 数和失败（协程版本）
+        
+        参数:
+            stage: 调用阶段
+            provider: 服务商名称
+            model: 模型名称
+            make_coro: 返回请求协程的无参数调用
+            stream: 是否为流式请求
+        
+        返回:
+            协程的返回值
+        """
+        start = time.monotonic()
+        try:
+            response = await make_coro()
+        except asyncio.CancelledError:
+            self.record(stage, provider, model, latency=time.monotonic() - start, cancelled=True)
+            raise
+        except Exception as e:
+            self.record(stage, provider, model, latency=time.monotonic() - start, error=e)
+            raise
+        if not stream:
+            self.record_response(stage, provider, model, response, time.monotonic() - start)
+        return response
+    
+    def _cost(self, record):
+        """
+        计算一次调用的费用，模型没有配置单价时返回 None
+        """
+        price = self.prices.get(record["model"])
+        if price is None:
+            return None
+        return record["prompt_tokens"] / 1000 * price[0] + record["completion_tokens"] / 1000 * price[1]
+    
+    def _aggregate(self, records):
+        """
+        汇总一组调用记录
+        """
+        summary = {
+            "calls": len(records),
+            "failed_calls": 0,  # 失败并触发重试或最终报错的调用次数
+            "cancelled_calls": 0,  # 被取消的调用次数，例如对冲请求中落后的副本
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+            "latency": 0.0,
+            "max_latency": 0.0,
+            "cost": None
+        }
+        for record in records:
+            if record.get("cancelled"):
+                summary["cancelled_calls"] += 1
+            elif not record["success"]:
+                summary["failed_calls"] += 1
+            summary["prompt_tokens"] += record["prompt_tokens"]
+            summary["completion_tokens"] += record["completion_tokens"]
+            summary["total_tokens"] += record["total_tokens"]
+            summary["latency"] += record["latency"]
+            summary["max_latency"] = max(summary["max_latency"], record["latency"])
+            cost = self._cost(record)
+            if cost is not None:
+                summary["cost"] = (summary["cost"] or 0.0) + cost
+        return summary
+    
+    def get_summary(self):
+        """
+        获取用量汇总
+        
+        latency 为各次调用耗时之和，并发调用时会大于实际经过的时间。
+        
+        返回:
+            dict: total 为整个任务的汇总，by_video、by_stage、by_provider 分别按视频、阶段、服务商汇总
+        """
+        with self._lock:
+            records = list(self.records)
+        
+        def group(key):
+            groups = {}
+            for record in records:
+                groups.setdefault(record[key], []).append(record)
+            return {name: self._aggregate(items) for name, items in groups.items()}
+        
+        total = self._aggregate(records)
+        total["elapsed"] = time.time() - self.started_at
+        return {
+            "total": total,
+            "by_video": group("video_id"),
+            "by_stage": group("stage"),
+            "by_provider": group("provider")
+        }
+    
+    def export_json(self, path):
+        """
+        将汇总和全部调用记录导出为 JSON 文件
+        
+        参数:
+            path: 输出文件路径
+        """
+        with self._lock:
+            records = list(self.records)
+        data = {"summary": self.get_summary(), "records": records}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    
+    def export_csv(self, path):
+        """
+        将全部调用记录导出为 CSV 文件，每次调用一行
+        
+        参数:
+            path: 输出文件路径
+        """
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+    
+    def reset(self):
+        """
+        清空调用记录，开始新的任务
+        """
+        with self._lock:
+            self.records = []
+            self.video_id = None
+            self.started_at = time.time()
+        _current_video.set(None)
+
+
+def get_usage_tracker():
+    """
+    获取进程内共享的用量统计，未指定统计对象的翻译器和摘要生成器都记录到这里
+    
+    返回:
+        UsageTracker: 共享的用量统计
+    """
+    global _default_tracker
+    with _default_tracker_lock:
+        if _default_tracker is None:
+            _default_tracker = UsageTracker()
+        return _default_tracker
@@ -1,4 +1,5 @@
 # AI摘要生成模块
-from .summarizer import AISummarizer
+from .summarizer import AISummarizer, IncrementalSummarizer
+from .summary_cache import SummaryCache
 
-__all__ = ['AISummarizer']
+__all__ = ['AISummarizer', 'IncrementalSummarizer', 'SummaryCache']
@@ -1,43 +1,67 @@
-import time
-import openai
+import hashlib
+import json
+import os
+import threading
+from llm import estimate_tokens, get_rate_limiter, get_provider_registry, get_usage_tracker, ContextThreadPoolExecutor, HedgedCompletion, TextSplitter
+
+# 摘要提示词版本，修改提示词后递增，使摘要缓存中的旧结果失效
+PROMPT_VERSION = "1"
+# 增量更新摘要的提示词版本
+UPDATE_PROMPT_VERSION = "1"
 
 class AISummarizer:
     """
     AI摘要生成器，支持阿里云百炼和七牛云大模型
     """
     
-    def __init__(self, model="dashscope", api_key=None):
+    def __init__(self, model="dashscope", api_key=None, rate_limiter=None, registry=None, failover_providers=None, usage_tracker=None, token_counter=None, cache=None):
         """
         初始化AI摘要生成器
         
         参数:
             model: 使用的AI模型，可选值: "dashscope"(阿里云百炼), "qiniu"(七牛云)
             api_key: API密钥
+            rate_limiter: 限速器 AdaptiveRateLimiter，为 None 时使用该服务商的共享限速器
+            registry: 服务商注册表 ProviderRegistry，为 None 时使用共享注册表
+            failover_providers: 备用服务商 {服务商名称: API密钥}，设置后启用对冲请求和失败切换
+            usage_tracker: 用量统计 UsageTracker，为 None 时使用共享统计
+            token_counter: 计算文本 token 数的函数，用于长文本分块，默认使用 estimate_tokens 估算
+            cache: 摘要缓存 SummaryCache，为 None 时不使用缓存
         """
         self.model = model
         self.api_key = api_key
-        self.client = None
+        self.registry = registry or get_provider_registry()
+        self.failover_providers = failover_providers
+        self.usage_tracker = usage_tracker or get_usage_tracker()
+        self.token_counter = token_counter or estimate_tokens
+        self.cache = cache
+        self.failover = None
+        self._rate_limiter = rate_limiter
         
         # 初始化AI客户端
         if api_key:
             self._init_client()
     
+    @property
+    def client(self):
+        """
+        当前服务商的AI客户端，每次从服务商注册表获取，同一服务商和密钥共用连接池
+        
+        重新注册服务商后自动使用新地址的客户端，不会继续使用已关闭的旧客户端。
+        """
+        if not self.api_key:
+            return None
+        return self.registry.get_client(self.model, self.api_key)
+    
     def _init_client(self):
         """
-        初始化AI客户端
-        """
-        if self.model == "dashscope":
-            # 阿里云百炼使用OpenAI兼容API
-            self.client = openai.OpenAI(
-                api_key=self.api_key,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
-            )
-        elif self.model == "qiniu":
-            # 七牛云使用OpenAI兼容API
-            self.client = openai.OpenAI(
-                api_key=self.api_key,
-                base_url="https://api.qnaigc.com/v1"
-            )
+        初始化多服务商对冲请求
+        """
+        if self.failover_providers:
+            providers = [(self.model, self.api_key)] + [
+                (name, api_key) for name, api_key in self.failover_providers.items() if name != self.model
+            ]
+            self.failover = HedgedCompletion(providers, self.registry, usage_tracker=self.usage_tracker)
     
     def set_model(self, model):
         """
@@ -51,9 +75,31 @@ class AISummarizer:
         if self.api_key:
             self._init_client()
     
+    def _get_rate_limiter(self):
+        """
+        获取限速器，未指定时使用当前服务商的共享限速器，与翻译器共用额度
+        """
+        return self._rate_limiter or get_rate_limiter(self.model)
+    
+    def _cache_scope(self, max_length, provider=None, prompt_version=PROMPT_VERSION):
+        """
+        构建摘要缓存的作用域，摘要只在相同服务商、模型、长度和提示词版本下复用
+        
+        参数:
+            provider: 生成摘要的服务商，未指定时为当前服务商；启用多服务商时由实际返回结果的服务商决定
+            prompt_version: 提示词版本，增量更新使用 "update-" 前缀与完整摘要区分
+        """
+        provider = provider or self.model
+        return {
+            "provider": provider,
+            "model": self.registry.get_model_name(provider),
+            "max_length": max_length,
+            "prompt_version": prompt_version
+        }
+    
     def summarize(self, text, max_length=200, max_retries=3):
         """
-        生成文本摘要
+        生成文本摘要，设置了摘要缓存时先查询缓存，未命中时生成并写入缓存
         
         参数:
             text: 要生成摘要的文本
@@ -66,45 +112,112 @@ class AISummarizer:
         if not text:
             return ""
         
-        for attempt in range(max_retries):
-            try:
-                return self._summarize_common(text, max_length)
-            except Exception as e:
-                print(f"生成摘要失败 (尝试 {attempt+1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** (attempt + 1))  # 指数退避
-                else:
-                    raise
+        if self.cache:
+            summary = self.cache.get(text, self._cache_scope(max_length))
+            if summary is not None:
+                return summary
+        
+        provider, summary = self._get_rate_limiter().call(
+            lambda: self._summarize_common(text, max_length),
+            estimate_tokens(text) + max_length,
+            max_retries,
+            "生成摘要失败"
+        )
+        if self.cache:
+            self.cache.put(text, summary, self._cache_scope(max_length, provider))
+        return summary
+    
+    def update_summary(self, summary, text, max_length=300, max_retries=3):
+        """
+        将新增文本合并进已有摘要，请求中只包含已有摘要和新增部分
+        
+        设置了摘要缓存时，相同的已有摘要和新增文本直接使用缓存的结果。
+        
+        参数:
+            summary: 已有摘要，为空时直接为新增文本生成摘要
+            text: 新增的文本
+            max_length: 摘要的最大长度
+            max_retries: 最大重试次数
+            
+        返回:
+            str: 更新后的摘要
+        """
+        if not text or not text.strip():
+            return summary
+        if not summary:
+            return self.summarize(text, max_length=max_length, max_retries=max_retries)
+        
+        # 结果同时取决于已有摘要和新增文本
+        cache_text = summary + "\x00" + text
+        prompt_version = "update-" + UPDATE_PROMPT_VERSION
+        if self.cache:
+            updated = self.cache.get(cache_text, self._cache_scope(max_length, prompt_version=prompt_version))
+            if updated is not None:
+                return updated
+        
+        provider, updated = self._get_rate_limiter().call(
+            lambda: self._update_summary_common(summary, text, max_length),
+            estimate_tokens(summary + text) + max_length,
+            max_retries,
+            "更新摘要失败"
+        )
+        if self.cache:
+            self.cache.put(cache_text, updated, self._cache_scope(max_length, provider, prompt_version))
+        return updated
     
-    def summarize_long_text(self, text, max_length=300, chunk_size=2000):
+    def summarize_long_text(self, text, max_length=300, chunk_tokens=1500, max_workers=4, fan_in=4, cancel_event=None):
         """
-        生成长文本摘要，通过分块处理
+        生成长文本摘要，分块并发生成摘要后逐层合并（map-reduce）
+        
+        每块摘要的长度固定为 min(max_length, chunk_tokens // fan_in)，不随块数减少；
+        合并时每 fan_in 个摘要并发合并为一个，直到合并后的文本能放进一块，
+        再生成最终摘要。总耗时随块数按对数增长。
+        每次请求都经过 summarize，设置了摘要缓存时，内容相同的分块和重复运行都直接使用缓存。
         
         参数:
             text: 要生成摘要的长文本
             max_length: 摘要的最大长度
-            chunk_size: 每块文本的大小
+            chunk_tokens: 每块的最大 token 数
+            max_workers: 同时生成摘要的最大请求数
+            fan_in: 每次合并的摘要数量
+            cancel_event: threading.Event，设置后不再发送新的请求，已发送的请求完成后返回
             
         返回:
-            str: 生成的摘要
+            str: 生成的摘要，被取消时返回空字符串
         """
         if not text:
             return ""
         
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+        
+        def summarize_part(part):
+            # 尚未开始的块在取消后直接跳过
+            if cancelled():
+                return ""
+            return self.summarize(part, max_length=part_length)
+        
         # 将长文本分成块
-        chunks = self._split_text(text, chunk_size)
+        chunks = self._split_text(text, chunk_tokens)
+        if len(chunks) == 1:
+            return self.summarize(chunks[0], max_length=max_length)
         
-        # 生成每块的摘要
-        chunk_summaries = []
-        for chunk in chunks:
-            chunk_summary = self.summarize(chunk, max_length=max_length // len(chunks))
-            chunk_summaries.append(chunk_summary)
+        fan_in = max(2, fan_in)
+        part_length = max(1, min(max_length, chunk_tokens // fan_in))
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 并发生成每块的摘要
+            summaries = list(executor.map(summarize_part, chunks))
+            
+            # 逐层合并，直到所有摘要能放进一块
+            while not cancelled() and len(summaries) > 1 and self.token_counter("\n".join(summaries)) > chunk_tokens:
+                groups = ["\n".join(summaries[i:i + fan_in]) for i in range(0, len(summaries), fan_in)]
+                summaries = list(executor.map(summarize_part, groups))
         
-        # 生成最终摘要
-        combined_summary = "\n".join(chunk_summaries)
-        final_summary = self.summarize(combined_summary, max_length=max_length)
+        if cancelled():
+            return ""
         
-        return final_summary
+        # 生成最终摘要
+        return self.summarize("\n".join(summaries), max_length=max_length)
     
     def generate_chapter_summary(self, chapters, max_length=150):
         """
@@ -128,20 +241,27 @@ class AISummarizer:
         
         return chapter_summaries
     
+    def _chat_completion(self, messages, stage="summarize", **kwargs):
+        """
+        发送对话请求并记录用量，启用多服务商时由对冲请求选择最先返回的服务商
+        
+        返回:
+            tuple: (服务商名称, 响应)
+        """
+        if self.failover:
+            return self.failover.create(messages, stage=stage, **kwargs)
+        model = self.registry.get_model_name(self.model)
+        return self.model, self.usage_tracker.track(
+            stage, self.model, model,
+            lambda: self.client.chat.completions.create(model=model, messages=messages, **kwargs),
+            kwargs.get("stream", False)
+        )
+    
     def _summarize_common(self, text, max_length):
         """
-        通用摘要生成方法，适用于支持的AI模型
+        通用摘要生成方法，适用于支持的AI模型，返回 (服务商名称, 摘要)
         """
-        # 选择合适的模型
-        if self.model == "dashscope":
-            model = "qwen-plus"  # 阿里云百炼模型
-        elif self.model == "qiniu":
-            model = "qwen-turbo"  # 七牛云模型
-        else:
-            model = "qwen-plus"  # 默认模型
-        
-        response = self.client.chat.completions.create(
-            model=model,
+        provider, response = self._chat_completion(
             messages=[
                 {
                     "role": "system",
@@ -155,33 +275,195 @@ class AISummarizer:
             temperature=0.3,
         )
         
-        return response.choices[0].message.content.strip()
+        return provider, response.choices[0].message.content.strip()
     
-    def _split_text(self, text, chunk_size):
+    def _update_summary_common(self, summary, text, max_length):
+        """
+        将新增文本合并进已有摘要，请求中只包含已有摘要和新增部分，返回 (服务商名称, 摘要)
         """
-        将文本分成指定大小的块
+        provider, response = self._chat_completion(
+            messages=[
+                {
+                    "role": "system",
+                    "content": "你是一个专业的摘要生成助手。请结合已有摘要和新增内容，输出更新后的简洁、准确、流畅的中文摘要，保留已有摘要中的重点，并补充新增内容的重点。"
+                },
+                {
+                    "role": "user",
+                    "content": f"已有摘要：\n{summary}\n\n新增内容：\n{text}\n\n请输出不超过{max_length}字的更新后的中文摘要："
+                }
+            ],
+            temperature=0.3,
+            stage="summarize_incremental"
+        )
+        
+        return provider, response.choices[0].message.content.strip()
+    
+    def _split_text(self, text, chunk_tokens):
+        """
+        将文本分成不超过 token 预算的块，优先在段落和句子边界切分
         
         参数:
             text: 要分块的文本
-            chunk_size: 每块文本的大小
+            chunk_tokens: 每块的最大 token 数
             
         返回:
             list: 分块后的文本列表
         """
-        chunks = []
-        current_chunk = ""
+        return TextSplitter(chunk_tokens, self.token_counter).split(text)
+
+class IncrementalSummarizer:
+    """
+    增量摘要生成器，维护一份滚动摘要，每收到一块新文本只把新增内容合并进摘要
+    
+    每次请求只包含当前摘要和新增的一块，总 token 数随文本长度线性增长，
+    流式或部分字幕也能尽早得到可用的摘要。状态可以保存到文件，重新运行时从上次的位置继续；
+    状态中记录来源标识和已合并各块的哈希，与当前输入不一致时从头生成。
+    """
+    
+    def __init__(self, summarizer, max_length=300, state_path=None, source_key=None):
+        """
+        初始化增量摘要生成器
         
-        paragraphs = text.split("\n")
+        参数:
+            summarizer: 用于发送请求的 AISummarizer
+            max_length: 摘要的最大长度
+            state_path: 状态文件路径，为 None 时不保存；文件存在时从中恢复
+            source_key: 输入来源的标识，例如视频ID；状态文件中的标识不同时不恢复
+        """
+        self.summarizer = summarizer
+        self.max_length = max_length
+        self.state_path = state_path
+        self.source_key = source_key
+        self.summary = ""
+        self.chunks_processed = 0
+        self.chunks_hash = ""
+        self._lock = threading.Lock()
         
-        for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) + 1 < chunk_size:
-                current_chunk += paragraph + "\n"
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = paragraph + "\n"
+        if state_path:
+            self.load_state()
+    
+    def update(self, chunk, max_retries=3):
+        """
+        将一块新文本合并进摘要
+        
+        参数:
+            chunk: 新增的文本
+            max_retries: 最大重试次数
+            
+        返回:
+            str: 更新后的摘要
+        """
+        with self._lock:
+            self.summary = self.summarizer.update_summary(self.summary, chunk, self.max_length, max_retries)
+            self.chunks_processed += 1
+            self.chunks_hash = self._chain_hash(self.chunks_hash, chunk)
+            if self.state_path:
+                self.save_state()
+            return self.summary
+    
+    def summarize_chunks(self, chunks, max_retries=3):
+        """
+        依次合并多块文本，跳过恢复的状态中已经处理过的块
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        跳过的块与状态中记录的哈希不一致（输入已变化）时，丢弃恢复的状态从头生成。
         
-        return chunks
+        参数:
+            chunks: 文本块列表或迭代器，重新运行时需按相同顺序提供
+            max_retries: 每块的最大重试次数
+            
+        返回:
+            str: 最终摘要
+        """
+        resumed = self.chunks_processed
+        prefix = []
+        for chunk in chunks:
+            if len(prefix) < resumed:
+                prefix.append(chunk)
+                if len(prefix) == resumed:
+                    self._verify_prefix(prefix, max_retries)
+                continue
+            self.update(chunk, max_retries)
+        if len(prefix) < resumed:
+            # 输入比保存的进度还短
+            self._verify_prefix(prefix, max_retries)
+        return self.summary
+    
+    def _verify_prefix(self, prefix, max_retries):
+        """
+        校验跳过的块与状态是否一致，不一致时重置状态并重新合并这些块
+        """
+        chunks_hash = ""
+        for chunk in prefix:
+            chunks_hash = self._chain_hash(chunks_hash, chunk)
+        if len(prefix) == self.chunks_processed and chunks_hash == self.chunks_hash:
+            return
+        print("摘要状态与当前输入不一致，将重新生成")
+        self.reset()
+        for chunk in prefix:
+            self.update(chunk, max_retries)
+    
+    @staticmethod
+    def _chain_hash(chunks_hash, chunk):
+        """
+        将一块文本累加到已合并各块的哈希中
+        """
+        chunk_hash = hashlib.sha256((chunk or "").encode("utf-8")).hexdigest()
+        return hashlib.sha256((chunks_hash + chunk_hash).encode("utf-8")).hexdigest()
+    
+    def get_state(self):
+        """
+        获取当前状态
+        
+        返回:
+            dict: 包含 summary（当前摘要）、chunks_processed（已合并的块数）、chunks_hash（已合并各块的哈希）、
+                  source_key 和 max_length
+        """
+        return {
+            "summary": self.summary,
+            "chunks_processed": self.chunks_processed,
+            "chunks_hash": self.chunks_hash,
+            "source_key": self.source_key,
+            "max_length": self.max_length
+        }
+    
+    def load_state(self):
+        """
+        从状态文件恢复摘要和进度，文件不存在、损坏，或来源标识、摘要长度与当前设置不同时从头开始
+        """
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取摘要状态失败，将重新生成: {e}")
+            return
+        if state.get("source_key") != self.source_key or state.get("max_length") != self.max_length:
+            print("摘要状态属于其他输入或摘要长度不同，将重新生成")
+            return
+        self.summary = state.get("summary", "")
+        self.chunks_processed = state.get("chunks_processed", 0)
+        self.chunks_hash = state.get("chunks_hash", "")
+    
+    def save_state(self):
+        """
+        保存状态，先写临时文件再替换，避免中断时损坏状态文件
+        """
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.get_state(), f, ensure_ascii=False)
+        os.replace(temp_path, self.state_path)
+    
+    def reset(self):
+        """
+        清空摘要和进度，并删除状态文件
+        """
+        with self._lock:
+            self.summary = ""
+            self.chunks_processed = 0
+            self.chunks_hash = ""
+            if self.state_path and os.path.exists(self.state_path):
+                os.remove(self.state_path)
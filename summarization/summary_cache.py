@@ -0,0 +1,89 @@
+from llm import SqliteLRUStore, normalize_text, text_hash
+
+class SummaryCache:
+    """
+    摘要结果缓存，基于 sqlite
+    
+    以规范化原文的哈希加上服务商、模型、摘要长度和提示词版本为键，
+    重复运行同一频道、重新导出以及长文本中内容相同的分块都无需再次调用大模型。
+    """
+    
+    def __init__(self, path, max_entries=100000):
+        """
+        初始化摘要缓存
+        
+        参数:
+            path: sqlite 数据库文件路径
+            max_entries: 最大条目数，超出后按最近访问时间淘汰
+        """
+        self.store = SqliteLRUStore(
+            path, "summaries",
+            [("source_hash", "TEXT"), ("provider", "TEXT"), ("model", "TEXT"),
+             ("max_length", "INTEGER"), ("prompt_version", "TEXT")],
+            [("summary", "TEXT")],
+            max_entries
+        )
+    
+    @staticmethod
+    def normalize(text):
+        """
+        规范化原文：去除首尾空白，合并每行内的连续空白，保留换行
+        """
+        return normalize_text(text)
+    
+    def _key(self, text, scope):
+        return (
+            text_hash(text),
+            scope["provider"],
+            scope["model"],
+            int(scope["max_length"]),
+            str(scope["prompt_version"])
+        )
+    
+    def get(self, text, scope):
+        """
+        查询摘要
+        
+        参数:
+            text: 原文
+            scope: 包含 provider、model、max_length、prompt_version 的字典
+        
+        返回:
+            str: 摘要，未命中时返回 None
+        """
+        row = self.store.get(self._key(text, scope))
+        return row[0] if row else None
+    
+    def put(self, text, summary, scope):
+        """
+        写入摘要，超出容量时淘汰最久未访问的条目
+        
+        参数:
+            text: 原文
+            summary: 摘要，为空时忽略
+            scope: 包含 provider、model、max_length、prompt_version 的字典
+        """
+        if not text or not summary:
+            return
+        self.store.put_many([self._key(text, scope) + (summary,)])
+    
+    def clear(self):
+        """
+        清空所有缓存的摘要
+        """
+        self.store.clear()
+    
+    def get_stats(self):
+        """
+        获取统计信息
+        
+        返回:
+            dict: 命中、未命中、写入、淘汰次数，当前条目数和命中率
+        """
+        return self.store.get_stats()
+    
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        self.store.close()
@@ -0,0 +1,82 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm import AdaptiveRateLimiter, ProviderRegistry, UsageTracker
+from translation import AITranslator, AsyncAITranslator
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    """
+    最小的 OpenAI 兼容对话接口，将用户消息加上服务器标签后原样返回
+    """
+    
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = f"{self.server.label}:{body['messages'][-1]['content']}"
+        data = json.dumps({
+            "id": "test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _start_server(label):
+    """
+    在后台线程启动本地对话接口，返回 (服务器, 接口地址)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+    server.label = label
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+class RegisterWhileInUseTest(unittest.TestCase):
+    """
+    翻译器存在期间重新注册服务商，后续调用应改用新地址，而不是使用已关闭的旧客户端
+    """
+    
+    def setUp(self):
+        self.old_server, self.old_url = _start_server("old")
+        self.new_server, self.new_url = _start_server("new")
+        self.registry = ProviderRegistry(http2=False)
+        self.registry.register("local", self.old_url)
+        self.limiter = AdaptiveRateLimiter(requests_per_minute=6000, tokens_per_minute=1000000)
+    
+    def tearDown(self):
+        self.registry.close()
+        for server in (self.old_server, self.new_server):
+            server.shutdown()
+            server.server_close()
+    
+    def test_sync_translator(self):
+        translator = AITranslator(model="local", api_key="test", rate_limiter=self.limiter, registry=self.registry, usage_tracker=UsageTracker())
+        self.assertEqual(translator.translate("hello"), "old:hello")
+        
+        self.registry.register("local", self.new_url)
+        self.assertEqual(translator.translate("hello"), "new:hello")
+    
+    def test_async_translator(self):
+        translator = AsyncAITranslator(model="local", api_key="test", rate_limiter=self.limiter, registry=self.registry, usage_tracker=UsageTracker())
+        self.assertEqual(translator.translate("hello"), "old:hello")
+        
+        self.registry.register("local", self.new_url)
+        self.assertEqual(translator.translate("hello"), "new:hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
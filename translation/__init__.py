@@ -1,5 +1,7 @@
 # AI翻译模块
 from .base_translator import BaseTranslator
 from .ai_translator import AITranslator
+from .async_translator import AsyncAITranslator
+from .translation_memory import TranslationMemory
 
-__all__ = ['BaseTranslator', 'AITranslator']
+__all__ = ['BaseTranslator', 'AITranslator', 'AsyncAITranslator', 'TranslationMemory']
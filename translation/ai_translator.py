@@ -1,45 +1,72 @@
 import os
+import queue
+import threading
 import time
-import openai
+from llm import estimate_tokens, get_rate_limiter, get_provider_registry, get_usage_tracker, ContextThreadPoolExecutor, HedgedCompletion
 from .base_translator import BaseTranslator
+from .async_translator import AsyncAITranslator
+
+# 提示词版本，修改翻译提示词后需要递增，使翻译记忆中的旧译文失效
+PROMPT_VERSION = "1"
 
 class AITranslator(BaseTranslator):
     """
     AI翻译器，支持阿里云百炼和七牛云大模型
     """
     
-    def __init__(self, model="dashscope", api_key=None):
+    def __init__(self, model="dashscope", api_key=None, max_concurrency=8, requests_per_minute=None, tokens_per_minute=None, memory=None, rate_limiter=None, registry=None, failover_providers=None, usage_tracker=None):
         """
         初始化AI翻译器
         
         参数:
             model: 使用的AI模型，可选值: "dashscope"(阿里云百炼), "qiniu"(七牛云)
             api_key: API密钥
+            max_concurrency: 批量翻译时同时在途的最大请求数
+            requests_per_minute: 每分钟最大请求数，为 None 时沿用共享限速器的配置
+            tokens_per_minute: 每分钟最大 token 数，为 None 时沿用共享限速器的配置
+            memory: 翻译记忆 TranslationMemory，为 None 时不使用
+            rate_limiter: 限速器 AdaptiveRateLimiter，为 None 时使用该服务商的共享限速器
+            registry: 服务商注册表 ProviderRegistry，为 None 时使用共享注册表
+            failover_providers: 备用服务商 {服务商名称: API密钥}，设置后启用对冲请求和失败切换
+            usage_tracker: 用量统计 UsageTracker，为 None 时使用共享统计
         """
         self.model = model
         self.api_key = api_key
-        self.client = None
+        self.registry = registry or get_provider_registry()
+        self.failover_providers = failover_providers
+        self.usage_tracker = usage_tracker or get_usage_tracker()
+        self.failover = None
+        self.memory = memory
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._rate_limiter = rate_limiter
+        self._async_translator = None
         
         # 初始化AI客户端
         if api_key:
             self._init_client()
     
+    @property
+    def client(self):
+        """
+        当前服务商的AI客户端，每次从服务商注册表获取，同一服务商和密钥共用连接池
+        
+        重新注册服务商后自动使用新地址的客户端，不会继续使用已关闭的旧客户端。
+        """
+        if not self.api_key:
+            return None
+        return self.registry.get_client(self.model, self.api_key)
+    
     def _init_client(self):
         """
-        初始化AI客户端
+        初始化多服务商对冲请求
         """
-        if self.model == "dashscope":
-            # 阿里云百炼使用OpenAI兼容API
-            self.client = openai.OpenAI(
-                api_key=self.api_key,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
-            )
-        elif self.model == "qiniu":
-            # 七牛云使用OpenAI兼容API
-            self.client = openai.OpenAI(
-                api_key=self.api_key,
-                base_url="https://api.qnaigc.com/v1"
-            )
+        if self.failover_providers:
+            providers = [(self.model, self.api_key)] + [
+                (name, api_key) for name, api_key in self.failover_providers.items() if name != self.model
+            ]
+            self.failover = HedgedCompletion(providers, self.registry, usage_tracker=self.usage_tracker)
     
     def set_model(self, model):
         """
@@ -49,10 +76,90 @@ class AITranslator(BaseTranslator):
             model: 使用的AI模型，可选值: "dashscope"(阿里云百炼), "qiniu"(七牛云)
         """
         self.model = model
+        self._async_translator = None
         # 如果已初始化，重新初始化客户端
         if self.api_key:
             self._init_client()
     
+    def _get_async_translator(self):
+        """
+        获取用于批量翻译的异步翻译器，与当前翻译器共享模型和密钥配置
+        """
+        if self._async_translator is None:
+            self._async_translator = AsyncAITranslator(
+                model=self.model,
+                api_key=self.api_key,
+                max_concurrency=self.max_concurrency,
+                requests_per_minute=self.requests_per_minute,
+                tokens_per_minute=self.tokens_per_minute,
+                rate_limiter=self._rate_limiter,
+                registry=self.registry,
+                failover_providers=self.failover_providers,
+                usage_tracker=self.usage_tracker
+            )
+        return self._async_translator
+    
+    def _get_rate_limiter(self):
+        """
+        获取限速器，未指定时使用当前服务商的共享限速器，与摘要生成器共用额度
+        """
+        if self._rate_limiter:
+            return self._rate_limiter
+        return get_rate_limiter(self.model, self.requests_per_minute, self.tokens_per_minute)
+    
+    def _get_model_name(self, provider=None):
+        """
+        获取服务商使用的模型，未指定服务商时为当前服务商
+        """
+        return self.registry.get_model_name(provider or self.model)
+    
+    def _memory_scope(self, source_lang, target_lang, provider=None):
+        """
+        构建翻译记忆的作用域，译文只在相同语言、服务商、模型和提示词版本下复用
+        
+        参数:
+            provider: 生成译文的服务商，未指定时为当前服务商；启用多服务商时由实际返回结果的服务商决定
+        """
+        provider = provider or self.model
+        return {
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "provider": provider,
+            "model": self._get_model_name(provider),
+            "prompt_version": PROMPT_VERSION
+        }
+    
+    def _put_memory(self, results, source_lang, target_lang, context=None):
+        """
+        按生成译文的服务商分组写入翻译记忆
+        
+        参数:
+            results: (原文, 服务商, 译文) 列表
+        """
+        if not self.memory:
+            return
+        by_provider = {}
+        for text, provider, translation in results:
+            if provider:
+                by_provider.setdefault(provider, []).append((text, translation))
+        for provider, pairs in by_provider.items():
+            self.memory.put_many(pairs, self._memory_scope(source_lang, target_lang, provider), context)
+    
+    def _with_memory(self, text, source_lang, target_lang, context, translate_func):
+        """
+        先查询翻译记忆，未命中时调用 translate_func 翻译并写入记忆
+        
+        translate_func 返回 (服务商, 译文)，译文按实际生成它的服务商写入记忆。
+        """
+        if self.memory:
+            translation = self.memory.get(text, self._memory_scope(source_lang, target_lang), context)
+            if translation is not None:
+                return translation
+        
+        provider, translation = translate_func()
+        self._put_memory([(text, provider, translation)], source_lang, target_lang, context)
+        return translation
+    
     def translate(self, text, source_lang='en', target_lang='zh', max_retries=3):
         """
         翻译文本
@@ -69,15 +176,254 @@ class AITranslator(BaseTranslator):
         if not text:
             return ""
         
-        for attempt in range(max_retries):
-            try:
-                return self._translate_common(text, source_lang, target_lang)
-            except Exception as e:
-                print(f"翻译失败 (尝试 {attempt+1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** (attempt + 1))  # 指数退避
-                else:
-                    raise
+        return self._with_memory(text, source_lang, target_lang, None, lambda: self._call_with_retries(
+            lambda: self._translate_common(text, source_lang, target_lang),
+            max_retries,
+            "翻译失败",
+            estimate_tokens(text) * 2
+        ))
+    
+    def _call_with_retries(self, func, max_retries, error_message, tokens=0):
+        """
+        在共享限速器下调用 func，失败时重试
+        
+        参数:
+            func: 无参数的调用
+            max_retries: 最大重试次数
+            error_message: 失败时打印的提示
+            tokens: 本次请求预计消耗的 token 数
+            
+        返回:
+            func 的返回值，重试耗尽后抛出最后一次的异常
+        """
+        return self._get_rate_limiter().call(func, tokens, max_retries, error_message)
+    
+    def translate_long_text(self, text, source_lang='en', target_lang='zh', chunk_tokens=1500, overlap_lines=2, max_workers=4, max_retries=3):
+        """
+        翻译长文本，按行切分为受 token 预算限制的块并发翻译
+        
+        每块只在行边界处切分，并附带前一块末尾的几行作为上下文（不翻译），
+        结果按原顺序拼接。某一块失败只重试该块，不会重试整篇文本。
+        
+        参数:
+            text: 要翻译的文本，每行一条字幕
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            chunk_tokens: 每块的最大 token 数（估算值）
+            overlap_lines: 作为上下文附带的前文行数
+            max_workers: 最大并发请求数
+            max_retries: 每块的最大重试次数
+            
+        返回:
+            str: 翻译后的文本
+        """
+        if not text:
+            return ""
+        
+        lines = text.strip("\n").split("\n")
+        chunks = self._split_lines(lines, chunk_tokens)
+        if len(chunks) == 1:
+            return self.translate(text, source_lang, target_lang, max_retries)
+        
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+            translated_chunks = list(executor.map(
+                lambda chunk: self._translate_lines(lines, chunk[0], chunk[1], source_lang, target_lang, overlap_lines, max_retries),
+                chunks
+            ))
+        
+        return "\n".join(translated_chunks)
+    
+    def _translate_lines(self, lines, start, end, source_lang, target_lang, overlap_lines, max_retries):
+        """
+        翻译 lines[start:end]，前 overlap_lines 行作为上下文
+        """
+        chunk_text = "\n".join(lines[start:end])
+        context = "\n".join(lines[max(0, start - overlap_lines):start])
+        return self._with_memory(chunk_text, source_lang, target_lang, context, lambda: self._call_with_retries(
+            lambda: self._translate_common(chunk_text, source_lang, target_lang, context),
+            max_retries,
+            f"翻译第 {start+1}-{end} 行失败",
+            estimate_tokens(context + chunk_text) * 2
+        ))
+    
+    def translate_stream(self, text, source_lang='en', target_lang='zh', context=None, max_retries=3, max_output_ratio=4):
+        """
+        流式翻译文本，边生成边返回译文片段
+        
+        提前关闭生成器即可取消请求；译文长度超过原文的 max_output_ratio 倍时视为输出异常，
+        取消请求并抛出 ValueError。完整生成的译文会写入翻译记忆。
+        
+        参数:
+            text: 要翻译的文本
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            context: 参考上下文，不翻译
+            max_retries: 建立连接的最大重试次数
+            max_output_ratio: 译文与原文长度之比的上限
+            
+        返回:
+            generator: 依次产生译文片段
+        """
+        if not text:
+            return
+        
+        if self.memory:
+            translation = self.memory.get(text, self._memory_scope(source_lang, target_lang), context)
+            if translation is not None:
+                yield translation
+                return
+        
+        # 只在收到第一个片段之前重试，已输出的片段无法撤回
+        # 生成期间一直占用限速器名额，读完或关闭响应后才释放
+        limiter = self._get_rate_limiter()
+        provider, stream = limiter.call(
+            lambda: self._translate_common(text, source_lang, target_lang, context, stream=True),
+            estimate_tokens((context or "") + text) * 2,
+            max_retries,
+            "翻译失败",
+            hold=True
+        )
+        max_chars = len(text) * max_output_ratio + 200
+        parts = []
+        length = 0
+        usage = None
+        failed = False
+        cancelled = False
+        start_time = time.monotonic()
+        try:
+            for chunk in stream:
+                # 开启 include_usage 时最后一个片段只包含用量
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not parts:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                parts.append(delta)
+                length += len(delta)
+                if length > max_chars:
+                    raise ValueError("译文长度异常，已取消翻译")
+                yield delta
+        except GeneratorExit:
+            # 调用方提前关闭生成器（停止或跳过视频），不计入限速器的成功次数
+            cancelled = True
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            stream.close()
+            limiter.release(success=not failed, cancelled=cancelled)
+            self.usage_tracker.record(
+                "translate_stream", provider, self._get_model_name(provider),
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                latency=time.monotonic() - start_time,
+                cancelled=cancelled
+            )
+        
+        self._put_memory([(text, provider, "".join(parts).strip())], source_lang, target_lang, context)
+    
+    def translate_long_text_stream(self, text, source_lang='en', target_lang='zh', chunk_tokens=1500, overlap_lines=2, max_workers=4, max_retries=3):
+        """
+        流式翻译长文本
+        
+        各块同时在后台流式翻译，译文片段按块的顺序返回：当前块边生成边返回，
+        后续块已生成的片段先缓存，轮到该块时立即返回并继续接收剩余片段。
+        提前关闭生成器时取消所有块的请求。
+        
+        参数:
+            text: 要翻译的长文本，按行分隔
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            chunk_tokens: 每块的最大 token 数（估算值）
+            overlap_lines: 作为上下文附带的前文行数
+            max_workers: 并发翻译的块数
+            max_retries: 每块的最大重试次数
+            
+        返回:
+            generator: 依次产生译文片段
+        """
+        if not text:
+            return
+        
+        lines = text.strip("\n").split("\n")
+        chunks = self._split_lines(lines, chunk_tokens)
+        queues = [queue.Queue() for _ in chunks]
+        stop = threading.Event()
+        executor = ContextThreadPoolExecutor(max_workers=max_workers)
+        try:
+            for (start, end), chunk_queue in zip(chunks, queues):
+                executor.submit(self._stream_lines, lines, start, end, source_lang, target_lang, overlap_lines, max_retries, chunk_queue, stop)
+            for index, chunk_queue in enumerate(queues):
+                if index > 0:
+                    yield "\n"
+                # 暂存片段末尾的空白，后面还有内容时再输出，使每块译文与 translate_long_text 一样去掉末尾空白
+                trailing = ""
+                while True:
+                    kind, value = chunk_queue.get()
+                    if kind == "done":
+                        break
+                    if kind == "error":
+                        raise value
+                    content = value.rstrip()
+                    if content:
+                        yield trailing + content
+                        trailing = value[len(content):]
+                    else:
+                        trailing += value
+        finally:
+            # 生成器提前关闭时取消尚未开始的块，并让正在生成的块关闭请求
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _stream_lines(self, lines, start, end, source_lang, target_lang, overlap_lines, max_retries, chunk_queue, stop):
+        """
+        流式翻译 lines[start:end]，前 overlap_lines 行作为上下文，译文片段依次放入 chunk_queue
+        
+        队列元素为 ("delta", 片段)、("error", 异常) 或 ("done", None)；stop 被设置后关闭请求。
+        """
+        chunk_text = "\n".join(lines[start:end])
+        context = "\n".join(lines[max(0, start - overlap_lines):start]) or None
+        stream = self.translate_stream(chunk_text, source_lang, target_lang, context=context, max_retries=max_retries)
+        try:
+            for delta in stream:
+                if stop.is_set():
+                    break
+                chunk_queue.put(("delta", delta))
+        except Exception as e:
+            chunk_queue.put(("error", e))
+            return
+        finally:
+            stream.close()
+        chunk_queue.put(("done", None))
+    
+    def _split_lines(self, lines, chunk_tokens):
+        """
+        按行将文本切分为不超过 token 预算的块，单行超出预算时单独成块
+        
+        参数:
+            lines: 文本行列表
+            chunk_tokens: 每块的最大 token 数（估算值）
+            
+        返回:
+            list: 每块对应的 (起始行, 结束行) 下标区间，左闭右开
+        """
+        chunks = []
+        start = 0
+        current_tokens = 0
+        for index, line in enumerate(lines):
+            line_tokens = estimate_tokens(line) + 1  # 换行符
+            if index > start and current_tokens + line_tokens > chunk_tokens:
+                chunks.append((start, index))
+                start = index
+                current_tokens = 0
+            current_tokens += line_tokens
+        chunks.append((start, len(lines)))
+        return chunks
     
     def translate_batch(self, texts, source_lang='en', target_lang='zh', batch_size=5):
         """
@@ -92,79 +438,126 @@ class AITranslator(BaseTranslator):
         返回:
             list: 翻译后的文本列表
         """
-        translated_texts = []
+        translations = {}
+        if self.memory:
+            translations = self.memory.get_many(texts, self._memory_scope(source_lang, target_lang))
+        
+        # 只翻译翻译记忆未命中的文本，相同的文本只发送一次
+        missing_texts = list(dict.fromkeys(text for index, text in enumerate(texts) if index not in translations))
+        if missing_texts:
+            # 各批次由异步翻译器并发发送，速率由并发数和每分钟预算控制，不再逐批等待
+            results = self._get_async_translator().translate_batch(missing_texts, source_lang, target_lang, batch_size, return_providers=True)
+            self._put_memory(
+                [(text, provider, translation) for text, (provider, translation) in zip(missing_texts, results)],
+                source_lang, target_lang
+            )
+            translated_by_text = {text: translation for text, (provider, translation) in zip(missing_texts, results)}
+            for index, text in enumerate(texts):
+                if index not in translations:
+                    translations[index] = translated_by_text[text]
+        
+        return [translations[index] for index in range(len(texts))]
+    
+    def translate_transcript(self, transcript, source_lang='en', target_lang='zh', chunk_tokens=800, context_lines=2, max_retries=3):
+        """
+        按时间轴逐条翻译字幕，保留每条字幕的时间信息
+        
+        字幕按 token 预算切分为连续的块，每块一次请求，前后各 context_lines 行原文
+        作为整块共享的上下文只发送一次，各块并发翻译并按编号逐条对齐。
         
-        # 分批处理
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
+        参数:
+            transcript: 字幕列表，每条包含 text、start、duration
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            chunk_tokens: 每块的最大 token 数（估算值）
+            context_lines: 每块前后附带的上下文行数
+            max_retries: 每次请求的最大重试次数
             
-            # 对于所有模型使用统一的批量处理方式
-            batch_translations = self._translate_batch_common(batch, source_lang, target_lang)
-            translated_texts.extend(batch_translations)
+        返回:
+            list: 字幕列表副本，每条增加 translated_text 字段
+        """
+        if not transcript:
+            return []
+        
+        texts = [entry['text'] for entry in transcript]
+        scope = self._memory_scope(source_lang, target_lang)
+        translations = {}
+        windows = []
+        requests = []
+        for start, end in self._split_lines(texts, chunk_tokens):
+            context_before = texts[max(0, start - context_lines):start]
+            context_after = texts[end:end + context_lines]
+            # 逐行译文依赖整块的前后文，翻译记忆按相同的前后文查询
+            context = "\n".join(context_before) + "\x00" + "\n".join(context_after)
+            window_texts = texts[start:end]
+            hits = self.memory.get_many(window_texts, scope, context) if self.memory else {}
+            for offset, translation in hits.items():
+                translations[start + offset] = translation
             
-            # 避免API速率限制
-            time.sleep(1)
+            missing = [start + offset for offset in range(len(window_texts)) if offset not in hits]
+            if missing:
+                windows.append((missing, context))
+                requests.append(([texts[index] for index in missing], context_before, context_after))
         
-        return translated_texts
+        if requests:
+            results = self._get_async_translator().translate_windows(requests, source_lang, target_lang, max_retries, return_providers=True)
+            for (indexes, context), window_results in zip(windows, results):
+                translations.update((index, translation) for index, (provider, translation) in zip(indexes, window_results))
+                self._put_memory(
+                    [(texts[index], provider, translation) for index, (provider, translation) in zip(indexes, window_results)],
+                    source_lang, target_lang, context
+                )
+        
+        return [dict(entry, translated_text=translations[index]) for index, entry in enumerate(transcript)]
     
-    def _translate_common(self, text, source_lang, target_lang):
-        """
-        通用翻译方法，适用于支持的AI模型
+    def _chat_completion(self, messages, stage="translate", **kwargs):
         """
-        # 选择合适的模型
-        if self.model == "dashscope":
-            model = "qwen-plus"  # 阿里云百炼模型
-        elif self.model == "qiniu":
-            model = "qwen-turbo"  # 七牛云模型
-        else:
-            model = "qwen-plus"  # 默认模型
+        发送对话请求并记录用量，启用多服务商时由对冲请求选择最先返回的服务商
         
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"你是一个专业的翻译助手。请将{source_lang}文本翻译成{target_lang}，保持原意准确，语言流畅自然。"
-                },
-                {
-                    "role": "user",
-                    "content": text
-                }
-            ],
-            temperature=0.3,
+        返回:
+            tuple: (服务商名称, 响应)
+        """
+        if self.failover:
+            return self.failover.create(messages, stage=stage, **kwargs)
+        model = self._get_model_name()
+        return self.model, self.usage_tracker.track(
+            stage, self.model, model,
+            lambda: self.client.chat.completions.create(model=model, messages=messages, **kwargs),
+            kwargs.get("stream", False)
         )
-        
-        return response.choices[0].message.content.strip()
     
-    def _translate_batch_common(self, texts, source_lang, target_lang):
+    def _translate_common(self, text, source_lang, target_lang, context=None, stream=False):
         """
-        通用批量翻译方法，适用于支持的AI模型
+        通用翻译方法，适用于支持的AI模型
+        
+        context 不为空时作为参考上下文一并发送，只翻译 text 部分；
+        stream 为 True 时返回流式响应，由调用方逐块读取。
+        返回 (服务商名称, 译文或流式响应)。
         """
-        # 选择合适的模型
-        if self.model == "dashscope":
-            model = "qwen-plus"  # 阿里云百炼模型
-        elif self.model == "qiniu":
-            model = "qwen-turbo"  # 七牛云模型
-        else:
-            model = "qwen-plus"  # 默认模型
+        system_prompt = f"你是一个专业的翻译助手。请将{source_lang}文本翻译成{target_lang}，保持原意准确，语言流畅自然。"
+        user_content = text
+        if context:
+            system_prompt += "请参考上下文信息以获得更准确的翻译，只输出要翻译文本的译文，逐行对应。"
+            user_content = f"上下文：{context}\n\n要翻译的文本：\n{text}"
         
-        responses = self.client.chat.completions.create(
-            model=model,
+        provider, response = self._chat_completion(
             messages=[
                 {
                     "role": "system",
-                    "content": f"你是一个专业的翻译助手。请将以下{source_lang}文本翻译成{target_lang}，保持原意准确，语言流畅自然。每个文本单独翻译，用换行符分隔。"
+                    "content": system_prompt
                 },
                 {
                     "role": "user",
-                    "content": "\n".join(texts)
+                    "content": user_content
                 }
             ],
             temperature=0.3,
+            **({"stream": True, "stream_options": {"include_usage": True}} if stream else {})
         )
+        if stream:
+            return provider, response
         
-        translated_text = responses.choices[0].message.content.strip()
-        return translated_text.split("\n")
+        return provider, response.choices[0].message.content.strip()
     
     def translate_with_context(self, text, context, source_lang='en', target_lang='zh'):
         """
@@ -182,17 +575,22 @@ class AITranslator(BaseTranslator):
         if not text:
             return ""
         
-        # 选择合适的模型
-        if self.model == "dashscope":
-            model = "qwen-plus"  # 阿里云百炼模型
-        elif self.model == "qiniu":
-            model = "qwen-turbo"  # 七牛云模型
-        else:
-            model = "qwen-plus"  # 默认模型
-        
+        return self._with_memory(
+            text, source_lang, target_lang, context,
+            lambda: self._call_with_retries(
+                lambda: self._translate_with_context_common(text, context, source_lang, target_lang),
+                1,
+                "翻译失败",
+                estimate_tokens(context + text) * 2
+            )
+        )
+    
+    def _translate_with_context_common(self, text, context, source_lang, target_lang):
+        """
+        带上下文的翻译请求，返回 (服务商名称, 译文)
+        """
         # 构建带上下文的翻译请求
-        response = self.client.chat.completions.create(
-            model=model,
+        provider, response = self._chat_completion(
             messages=[
                 {
                     "role": "system",
@@ -204,6 +602,7 @@ class AITranslator(BaseTranslator):
                 }
             ],
             temperature=0.3,
-            max_tokens=1000
+            max_tokens=1000,
+            stage="translate_context"
         )
-        return response.choices[0].message.content.strip()
+        return provider, response.choices[0].message.content.strip()
@@ -0,0 +1,292 @@
+import asyncio
+from llm import estimate_tokens, get_rate_limiter, get_provider_registry, get_usage_tracker, HedgedCompletion
+from .base_translator import BaseTranslator
+from .batch_protocol import build_batch_messages, parse_batch_response
+
+class AsyncAITranslator(BaseTranslator):
+    """
+    基于 asyncio 的AI翻译器，以有限并发同时发送多个请求
+    
+    提供 atranslate/atranslate_batch 协程接口，以及与 AITranslator 相同签名的同步接口。
+    同步接口在服务商注册表的后台事件循环线程中执行，可以在任意线程中调用。
+    """
+    
+    def __init__(self, model="dashscope", api_key=None, max_concurrency=8, requests_per_minute=None, tokens_per_minute=None, rate_limiter=None, registry=None, failover_providers=None, usage_tracker=None):
+        """
+        初始化异步AI翻译器
+        
+        参数:
+            model: 使用的AI模型，可选值: "dashscope"(阿里云百炼), "qiniu"(七牛云)
+            api_key: API密钥
+            max_concurrency: 同时在途的最大请求数
+            requests_per_minute: 每分钟最大请求数，为 None 时沿用共享限速器的配置
+            tokens_per_minute: 每分钟最大 token 数（估算值），为 None 时沿用共享限速器的配置
+            rate_limiter: 限速器 AdaptiveRateLimiter，为 None 时使用该服务商的共享限速器
+            registry: 服务商注册表 ProviderRegistry，为 None 时使用共享注册表
+            failover_providers: 备用服务商 {服务商名称: API密钥}，设置后启用对冲请求和失败切换
+            usage_tracker: 用量统计 UsageTracker，为 None 时使用共享统计
+        """
+        self.model = model
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.registry = registry or get_provider_registry()
+        self.failover_providers = failover_providers
+        self.usage_tracker = usage_tracker or get_usage_tracker()
+        self.failover = None
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._rate_limiter = rate_limiter
+        self._semaphore = None
+        
+        # 初始化AI客户端
+        if api_key:
+            self._init_client()
+    
+    @property
+    def client(self):
+        """
+        当前服务商的异步AI客户端，每次从服务商注册表获取，同一服务商和密钥共用连接池
+        
+        重新注册服务商后自动使用新地址的客户端，不会继续使用已关闭的旧客户端。
+        """
+        if not self.api_key:
+            return None
+        return self.registry.get_async_client(self.model, self.api_key)
+    
+    def _init_client(self):
+        """
+        初始化多服务商对冲请求
+        """
+        if self.failover_providers:
+            providers = [(self.model, self.api_key)] + [
+                (name, api_key) for name, api_key in self.failover_providers.items() if name != self.model
+            ]
+            self.failover = HedgedCompletion(providers, self.registry, usage_tracker=self.usage_tracker)
+    
+    def set_model(self, model):
+        """
+        设置使用的AI模型
+        
+        参数:
+            model: 使用的AI模型，可选值: "dashscope"(阿里云百炼), "qiniu"(七牛云)
+        """
+        self.model = model
+        # 如果已初始化，重新初始化客户端
+        if self.api_key:
+            self._init_client()
+    
+    def _get_model_name(self):
+        """
+        获取当前服务商使用的模型
+        """
+        return self.registry.get_model_name(self.model)
+    
+    def _get_rate_limiter(self):
+        """
+        获取限速器，未指定时使用当前服务商的共享限速器
+        """
+        if self._rate_limiter:
+            return self._rate_limiter
+        return get_rate_limiter(self.model, self.requests_per_minute, self.tokens_per_minute)
+    
+    def _run(self, coro):
+        """
+        在注册表的后台事件循环中执行协程并等待结果
+        """
+        return self.registry.run(coro)
+    
+    async def _create_completion(self, messages, stage="translate_batch", **kwargs):
+        """
+        在并发数限制下发送一次对话请求并记录用量，启用多服务商时由对冲请求选择最先返回的服务商
+        
+        返回:
+            tuple: (服务商名称, 响应)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async with self._semaphore:
+            if self.failover:
+                return await self.failover.acreate(messages, stage=stage, temperature=0.3, **kwargs)
+            model = self._get_model_name()
+            return self.model, await self.usage_tracker.atrack(
+                stage, self.model, model,
+                lambda: self.client.chat.completions.create(model=model, messages=messages, temperature=0.3, **kwargs)
+            )
+    
+    async def _request(self, messages, max_retries, error_message, stage="translate_batch"):
+        """
+        在共享限速器下发送对话请求，失败时重试，返回 (服务商名称, 响应)
+        """
+        estimated_tokens = sum(estimate_tokens(message["content"]) for message in messages) * 2
+        return await self._get_rate_limiter().acall(
+            lambda: self._create_completion(messages, stage),
+            estimated_tokens,
+            max_retries,
+            error_message
+        )
+    
+    async def atranslate(self, text, source_lang='en', target_lang='zh', max_retries=3):
+        """
+        异步翻译文本
+        
+        参数:
+            text: 要翻译的文本
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            max_retries: 最大重试次数
+        
+        返回:
+            str: 翻译后的文本
+        """
+        if not text:
+            return ""
+        
+        provider, translation = await self._atranslate_common(text, source_lang, target_lang, max_retries)
+        return translation
+    
+    async def _atranslate_common(self, text, source_lang, target_lang, max_retries):
+        """
+        翻译单条文本，返回 (服务商名称, 译文)
+        """
+        messages = [
+            {
+                "role": "system",
+                "content": f"你是一个专业的翻译助手。请将{source_lang}文本翻译成{target_lang}，保持原意准确，语言流畅自然。"
+            },
+            {
+                "role": "user",
+                "content": text
+            }
+        ]
+        provider, response = await self._request(messages, max_retries, "翻译失败", "translate")
+        return provider, response.choices[0].message.content.strip()
+    
+    async def atranslate_batch(self, texts, source_lang='en', target_lang='zh', batch_size=5, max_retries=3, return_providers=False):
+        """
+        异步批量翻译文本，所有批次并发发送
+        
+        参数:
+            texts: 要翻译的文本列表
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            batch_size: 每批处理的文本数量
+            max_retries: 每次请求的最大重试次数
+            return_providers: 为 True 时每个元素为 (服务商名称, 译文)，空文本的服务商为 None
+            
+        返回:
+            list: 翻译后的文本列表，与 texts 一一对应
+        """
+        batches = [texts[i:i+batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(
+            self._atranslate_batch_common(batch, source_lang, target_lang, max_retries)
+            for batch in batches
+        ))
+        
+        translated_texts = []
+        for batch_results in results:
+            translated_texts.extend(batch_results if return_providers else [translation for provider, translation in batch_results])
+        return translated_texts
+    
+    async def atranslate_windows(self, windows, source_lang='en', target_lang='zh', max_retries=3, return_providers=False):
+        """
+        异步翻译多个连续文本块，每块附带一次共享的前后文，所有块并发发送
+        
+        参数:
+            windows: (文本列表, 前文行列表, 后文行列表) 列表
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            max_retries: 每次请求的最大重试次数
+            return_providers: 为 True 时译文列表的每个元素为 (服务商名称, 译文)，空文本的服务商为 None
+            
+        返回:
+            list: 每块的译文列表，与 windows 一一对应
+        """
+        results = await asyncio.gather(*(
+            self._atranslate_batch_common(texts, source_lang, target_lang, max_retries, context_before=context_before, context_after=context_after)
+            for texts, context_before, context_after in windows
+        ))
+        if return_providers:
+            return results
+        return [[translation for provider, translation in window_results] for window_results in results]
+    
+    async def _atranslate_batch_common(self, texts, source_lang, target_lang, max_retries=3, max_rounds=3, context_before=None, context_after=None):
+        """
+        通用批量翻译方法，使用带编号的结构化格式并校验对齐
+        
+        回复中缺失或格式错误的条目只针对这些条目重新请求，
+        多轮之后仍缺失的条目逐条单独翻译。
+        返回与 texts 一一对应的 (服务商名称, 译文) 列表，空文本的服务商为 None。
+        """
+        pending = {index: text for index, text in enumerate(texts) if text}
+        translations = {index: (None, "") for index, text in enumerate(texts) if not text}
+        
+        for round_number in range(max_rounds):
+            if not pending:
+                break
+            if round_number > 0:
+                print(f"{len(pending)} 条译文缺失或格式错误，重新请求这些条目")
+            
+            messages = build_batch_messages(sorted(pending.items()), source_lang, target_lang, context_before, context_after)
+            provider, response = await self._request(messages, max_retries, "批量翻译失败")
+            parsed = parse_batch_response(response.choices[0].message.content, pending.keys())
+            translations.update((index, (provider, translation)) for index, translation in parsed.items())
+            for index in parsed:
+                del pending[index]
+        
+        # 多轮之后仍未对齐的条目逐条翻译
+        if pending:
+            single_results = await asyncio.gather(*(
+                self._atranslate_common(text, source_lang, target_lang, max_retries)
+                for text in pending.values()
+            ))
+            translations.update(zip(pending.keys(), single_results))
+        
+        return [translations[index] for index in range(len(texts))]
+    
+    def translate(self, text, source_lang='en', target_lang='zh', max_retries=3):
+        """
+        翻译文本（同步接口）
+        
+        参数:
+            text: 要翻译的文本
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            max_retries: 最大重试次数
+        
+        返回:
+            str: 翻译后的文本
+        """
+        return self._run(self.atranslate(text, source_lang, target_lang, max_retries))
+    
+    def translate_batch(self, texts, source_lang='en', target_lang='zh', batch_size=5, return_providers=False):
+        """
+        批量翻译文本（同步接口），各批次并发发送
+        
+        参数:
+            texts: 要翻译的文本列表
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            batch_size: 每批处理的文本数量
+            return_providers: 为 True 时每个元素为 (服务商名称, 译文)
+        
+        返回:
+            list: 翻译后的文本列表
+        """
+        return self._run(self.atranslate_batch(texts, source_lang, target_lang, batch_size, return_providers=return_providers))
+    
+    def translate_windows(self, windows, source_lang='en', target_lang='zh', max_retries=3, return_providers=False):
+        """
+        翻译多个带共享前后文的连续文本块（同步接口），各块并发发送
+        
+        参数:
+            windows: (文本列表, 前文行列表, 后文行列表) 列表
+            source_lang: 源语言，默认为英语
+            target_lang: 目标语言，默认为中文
+            max_retries: 每次请求的最大重试次数
+            return_providers: 为 True 时译文列表的每个元素为 (服务商名称, 译文)
+        
+        返回:
+            list: 每块的译文列表
+        """
+        return self._run(self.atranslate_windows(windows, source_lang, target_lang, max_retries, return_providers=return_providers))
@@ -0,0 +1,100 @@
+import json
+import re
+
+# 回复可能被包裹在 ```json ... ``` 代码块中
+_CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def build_batch_messages(segments, source_lang, target_lang, context_before=None, context_after=None):
+    """
+    构建结构化批量翻译请求，每条文本带编号，要求模型按编号返回 JSON
+    
+    提供上下文时，前后文作为整批共享的参考只发送一次，不需要翻译。
+    
+    参数:
+        segments: (编号, 文本) 列表
+        source_lang: 源语言
+        target_lang: 目标语言
+        context_before: 这批文本之前的原文行列表，可选
+        context_after: 这批文本之后的原文行列表，可选
+        
+    返回:
+        list: 对话消息列表
+    """
+    payload = [{"id": segment_id, "text": text} for segment_id, text in segments]
+    system_prompt = (
+        f"你是一个专业的翻译助手。请将以下{source_lang}文本翻译成{target_lang}，保持原意准确，语言流畅自然。"
+        "输入是一个JSON数组，每个元素包含编号id和原文text。请逐条翻译，不要合并、拆分、遗漏或新增条目，"
+        "只输出一个JSON数组，每个元素包含原样的id和译文text，不要输出其他内容。"
+    )
+    if context_before or context_after:
+        system_prompt = (
+            f"你是一个专业的翻译助手。请将以下{source_lang}文本翻译成{target_lang}，保持原意准确，语言流畅自然。"
+            "输入是一个JSON对象：segments 是要翻译的数组，每个元素包含编号id和原文text；"
+            "context_before 和 context_after 是紧邻的前文和后文，仅供理解语境，不要翻译。"
+            "请逐条翻译 segments，不要合并、拆分、遗漏或新增条目，"
+            "只输出一个JSON数组，每个元素包含原样的id和译文text，不要输出其他内容。"
+        )
+        payload = {
+            "context_before": "\n".join(context_before or []),
+            "segments": payload,
+            "context_after": "\n".join(context_after or [])
+        }
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": json.dumps(payload, ensure_ascii=False)
+        }
+    ]
+
+
+def parse_batch_response(content, expected_ids):
+    """
+    解析结构化批量翻译的回复，校验编号对齐
+    
+    参数:
+        content: 模型回复的文本
+        expected_ids: 本次请求中的编号集合
+        
+    返回:
+        dict: 编号 -> 译文，只包含编号有效且译文非空的条目；缺失或格式错误的条目不在结果中
+    """
+    if not content:
+        return {}
+    
+    text = _CODE_FENCE_PATTERN.sub("", content.strip())
+    try:
+        items = json.loads(text)
+    except ValueError:
+        # 回复中夹杂了说明文字时，尝试截取最外层的 JSON 数组
+        start = text.find("[")
+        end = text.rfind("]")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            items = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+    
+    if isinstance(items, dict):
+        items = items.get("translations") or items.get("items") or items.get("segments") or []
+    if not isinstance(items, list):
+        return {}
+    
+    expected_ids = set(expected_ids)
+    translations = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        segment_id = item.get("id")
+        if isinstance(segment_id, str) and segment_id.isdigit():
+            segment_id = int(segment_id)
+        translated = item.get("text")
+        # 重复的编号只保留第一次出现的译文
+        if segment_id in expected_ids and segment_id not in translations and isinstance(translated, str) and translated.strip():
+            translations[segment_id] = translated.strip()
+    return translations
@@ -0,0 +1,161 @@
+import json
+from llm import SqliteLRUStore, normalize_text, text_hash
+
+class TranslationMemory:
+    """
+    句段级翻译记忆，基于 sqlite
+    
+    以规范化原文的哈希加上源/目标语言、服务商、模型和提示词版本为键，
+    重复出现的句段（片头、片尾、赞助口播、"[Music]" 等）和重复运行都无需再次调用大模型。
+    """
+    
+    def __init__(self, path, max_entries=500000):
+        """
+        初始化翻译记忆
+        
+        参数:
+            path: sqlite 数据库文件路径
+            max_entries: 最大条目数，超出后按最近访问时间淘汰
+        """
+        self.store = SqliteLRUStore(
+            path, "segments",
+            [("source_hash", "TEXT"), ("source_lang", "TEXT"), ("target_lang", "TEXT"),
+             ("provider", "TEXT"), ("model", "TEXT"), ("prompt_version", "TEXT")],
+            [("source_text", "TEXT"), ("translation", "TEXT")],
+            max_entries
+        )
+    
+    @staticmethod
+    def normalize(text):
+        """
+        规范化原文：去除首尾空白，合并每行内的连续空白，保留换行
+        """
+        return normalize_text(text)
+    
+    def _hash(self, text, context=None):
+        if context:
+            # 带上下文的翻译结果依赖上下文，需要一并计入键
+            return text_hash(normalize_text(text) + "\x00" + normalize_text(context))
+        return text_hash(text)
+    
+    def _key(self, text, scope, context=None):
+        return (
+            self._hash(text, context),
+            scope["source_lang"],
+            scope["target_lang"],
+            scope["provider"],
+            scope["model"],
+            str(scope["prompt_version"])
+        )
+    
+    def get(self, text, scope, context=None):
+        """
+        查询单条译文
+        
+        参数:
+            text: 原文
+            scope: 包含 source_lang、target_lang、provider、model、prompt_version 的字典
+            context: 翻译时使用的上下文，没有时为 None
+        
+        返回:
+            str: 译文，未命中时返回 None
+        """
+        return self.get_many([text], scope, context).get(0)
+    
+    def get_many(self, texts, scope, context=None):
+        """
+        批量查询译文
+        
+        参数:
+            texts: 原文列表
+            scope: 包含 source_lang、target_lang、provider、model、prompt_version 的字典
+            context: 翻译时使用的上下文，没有时为 None
+        
+        返回:
+            dict: 下标 -> 译文，只包含命中的条目
+        """
+        rows = self.store.get_many([self._key(text, scope, context) for text in texts])
+        return {index: row[1] for index, row in rows.items()}
+    
+    def put(self, text, translation, scope, context=None):
+        """
+        写入单条译文
+        
+        参数:
+            text: 原文
+            translation: 译文
+            scope: 包含 source_lang、target_lang、provider、model、prompt_version 的字典
+            context: 翻译时使用的上下文，没有时为 None
+        """
+        self.put_many([(text, translation)], scope, context)
+    
+    def put_many(self, pairs, scope, context=None):
+        """
+        批量写入译文，超出容量时淘汰最久未访问的条目
+        
+        参数:
+            pairs: (原文, 译文) 列表，译文为空的条目会被忽略
+            scope: 包含 source_lang、target_lang、provider、model、prompt_version 的字典
+            context: 翻译时使用的上下文，没有时为 None
+        """
+        self.store.put_many([
+            self._key(text, scope, context) + (text, translation)
+            for text, translation in pairs
+            if text and translation
+        ])
+    
+    def export_entries(self, path):
+        """
+        将翻译记忆导出为 JSON Lines 文件，便于在多台机器之间共享
+        
+        参数:
+            path: 导出文件路径
+        
+        返回:
+            int: 导出的条目数
+        """
+        columns = ["source_hash", "source_lang", "target_lang", "provider", "model",
+                   "prompt_version", "source_text", "translation", "created_at"]
+        rows = self.store.select(columns)
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+        return len(rows)
+    
+    def import_entries(self, path):
+        """
+        从 export_entries 导出的 JSON Lines 文件导入条目，已存在的条目会被覆盖
+        
+        参数:
+            path: 导入文件路径
+        
+        返回:
+            int: 导入的条目数
+        """
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                rows.append((
+                    entry["source_hash"], entry["source_lang"], entry["target_lang"], entry["provider"],
+                    entry["model"], str(entry["prompt_version"]), entry["source_text"], entry["translation"]
+                ))
+        self.store.put_many(rows)
+        return len(rows)
+    
+    def get_stats(self):
+        """
+        获取统计信息
+        
+        返回:
+            dict: 命中、未命中、写入、淘汰次数，当前条目数和命中率
+        """
+        return self.store.get_stats()
+    
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        self.store.close()
\ No newline at end of file
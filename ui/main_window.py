@@ -1,13 +1,18 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import customtkinter as ctk
-from youtube_api import ChannelProcessor, SubtitleProcessor
-from translation import AITranslator
-from summarization import AISummarizer
+from youtube_api import ChannelProcessor, SubtitleProcessor, MetadataCache, TranscriptCache, ChannelSync
+from translation import AITranslator, TranslationMemory
+from summarization import AISummarizer, SummaryCache
+from llm import get_provider_registry, UsageTracker, ContextThreadPoolExecutor
 from export import TextExporter, PDFExporter, EPUBExporter
+import os
 import threading
 import time
 
+# 流式译文合并刷新到界面的间隔（毫秒）
+STREAM_FLUSH_INTERVAL = 100
+
 class MainWindow:
     """
     主窗口类，使用customtkinter创建现代化的UI界面
@@ -23,9 +28,17 @@ class MainWindow:
         self.root.title("YouTube字幕翻译工具")
         self.root.geometry("1200x800")
         
+        # 缓存目录，保存元数据等可在多次运行之间复用的数据
+        self.cache_dir = os.path.join(os.path.expanduser("~"), ".youtube_subtitle_translator")
+        
         # 初始化处理器
-        self.channel_processor = ChannelProcessor()
-        self.subtitle_processor = SubtitleProcessor()
+        self.metadata_cache = MetadataCache(os.path.join(self.cache_dir, "metadata.sqlite"))
+        self.channel_processor = ChannelProcessor(cache=self.metadata_cache)
+        self.channel_sync = ChannelSync(self.channel_processor, os.path.join(self.cache_dir, "sync"))
+        self.translation_memory = TranslationMemory(os.path.join(self.cache_dir, "translation_memory.sqlite"))
+        self.summary_cache = SummaryCache(os.path.join(self.cache_dir, "summary_cache.sqlite"))
+        self.transcript_cache = TranscriptCache(os.path.join(self.cache_dir, "transcripts.sqlite"))
+        self.subtitle_processor = SubtitleProcessor(cache=self.transcript_cache)
         self.translator = None
         self.summarizer = None
         
@@ -41,6 +54,14 @@ class MainWindow:
         self.current_video_index = 0
         self.is_stop = False
         
+        # 流式译文缓冲，处理线程写入，界面线程定时合并刷新
+        self._stream_buffer = []
+        self._stream_lock = threading.Lock()
+        self._stream_flush_pending = False
+        self._streaming_view = False
+        # 用户在本次处理中手动选择过视频后，新视频开始时不再接管显示区域
+        self._user_selected_video = False
+        
         # 创建UI组件
         self._create_widgets()
         
@@ -70,7 +91,7 @@ class MainWindow:
         
         ctk.CTkLabel(model_frame, text="AI模型:", font=ctk.CTkFont(size=12)).pack(side=tk.LEFT, padx=5)
         self.model_var = ctk.StringVar(value="qiniu")
-        model_dropdown = ctk.CTkOptionMenu(model_frame, variable=self.model_var, values=["dashscope", "qiniu"])
+        model_dropdown = ctk.CTkOptionMenu(model_frame, variable=self.model_var, values=get_provider_registry().get_providers())
         model_dropdown.pack(side=tk.LEFT, padx=5)
         
         # API密钥输入
@@ -90,6 +111,11 @@ class MainWindow:
         export_dropdown = ctk.CTkOptionMenu(export_frame, variable=self.export_format_var, values=["txt", "pdf", "epub"])
         export_dropdown.pack(side=tk.LEFT, padx=5)
         
+        # 增量同步：只处理上次同步后新上传的视频
+        self.incremental_var = ctk.BooleanVar(value=False)
+        incremental_checkbox = ctk.CTkCheckBox(config_frame, text="增量同步", variable=self.incremental_var, font=ctk.CTkFont(size=12))
+        incremental_checkbox.pack(side=tk.LEFT, padx=10, pady=10)
+        
         # 控制按钮区域
         button_frame = ctk.CTkFrame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
@@ -186,8 +212,11 @@ class MainWindow:
         self.export_button.configure(state=tk.DISABLED)
         self.clear_button.configure(state=tk.DISABLED)
         
+        self._user_selected_video = False
+        
         # 在新线程中处理，避免阻塞UI
-        threading.Thread(target=self._process_channel, args=(url, api_key, model, self._update_status_progress, self._receive_video, self._finish_process)).start()
+        incremental = self.incremental_var.get()
+        threading.Thread(target=self._process_channel, args=(url, api_key, model, self._update_status_progress, self._receive_video, self._finish_process, incremental)).start()
 
     def _update_status_progress(self, status, progress):
         """
@@ -203,6 +232,59 @@ class MainWindow:
         self.processed_data['videos'].append(video)
         self.root.after(0, self._add_video_to_list, video['title'])
 
+    def _begin_stream(self):
+        """
+        开始显示正在翻译的视频，用户未手动选择视频时清空摘要和字幕区域
+        """
+        with self._stream_lock:
+            self._stream_buffer = []
+        self.root.after(0, self._reset_stream_view)
+    
+    def _reset_stream_view(self):
+        """
+        清空摘要和字幕区域，用于显示流式译文
+        
+        用户在本次处理中选择过视频时保留正在查看的内容，不追加流式译文
+        """
+        if self._user_selected_video:
+            return
+        self._streaming_view = True
+        self.summary_text.configure(state=tk.NORMAL)
+        self.summary_text.delete(1.0, tk.END)
+        self.summary_text.configure(state=tk.DISABLED)
+        
+        self.subtitle_text.configure(state=tk.NORMAL)
+        self.subtitle_text.delete(1.0, tk.END)
+        self.subtitle_text.configure(state=tk.DISABLED)
+    
+    def _receive_stream_delta(self, delta):
+        """
+        接收流式译文片段，合并为每 STREAM_FLUSH_INTERVAL 毫秒一次的界面更新
+        """
+        with self._stream_lock:
+            self._stream_buffer.append(delta)
+            if self._stream_flush_pending:
+                return
+            self._stream_flush_pending = True
+        self.root.after(STREAM_FLUSH_INTERVAL, self._flush_stream)
+    
+    def _flush_stream(self):
+        """
+        将缓冲的译文片段一次性追加到字幕区域
+        """
+        with self._stream_lock:
+            text = "".join(self._stream_buffer)
+            self._stream_buffer = []
+            self._stream_flush_pending = False
+        # 用户切换到其他视频时不再追加
+        if not text or not self._streaming_view:
+            return
+        
+        self.subtitle_text.configure(state=tk.NORMAL)
+        self.subtitle_text.insert(tk.END, text)
+        self.subtitle_text.see(tk.END)
+        self.subtitle_text.configure(state=tk.DISABLED)
+    
     def _finish_process(self):
         """
         处理完成后更新UI
@@ -214,21 +296,29 @@ class MainWindow:
         self.root.after(0, lambda: self.export_button.configure(state=tk.NORMAL))   
         self.root.after(0, lambda: self.clear_button.configure(state=tk.NORMAL))   
         
-    def _process_channel(self, url, api_key, model, status_progress_updater, video_receiver, finish_callback):
+    def _process_channel(self, url, api_key, model, status_progress_updater, video_receiver, finish_callback, incremental=False):
         """
         处理YouTube频道、播放列表或单个视频
+        
+        incremental 为 True 时只处理上次同步后新增的视频
         """
         progress = 0.1
+        # 摘要在单独的线程中与翻译同时生成
+        summary_executor = ContextThreadPoolExecutor(max_workers=1)
+        summary_cancel = None
         try:
             if self.is_stop:
                 return
             # 1. 获取URL类型和ID
             status_progress_updater("正在分析URL...", progress)
 
-            channel_processor = ChannelProcessor()
-            subtitle_processor = SubtitleProcessor()
-            translator = AITranslator(api_key=api_key, model=model)
-            summarizer = AISummarizer(api_key=api_key, model=model)
+            # 复用窗口持有的频道处理器，使HTTP连接池在多次处理之间保持复用
+            channel_processor = self.channel_processor
+            subtitle_processor = self.subtitle_processor
+            # 每次处理单独统计大模型用量，按视频汇总
+            usage_tracker = UsageTracker()
+            translator = AITranslator(api_key=api_key, model=model, memory=self.translation_memory, usage_tracker=usage_tracker)
+            summarizer = AISummarizer(api_key=api_key, model=model, usage_tracker=usage_tracker, cache=self.summary_cache)
             
             url_type, id = channel_processor.get_url_type_and_id(url)
             
@@ -236,23 +326,22 @@ class MainWindow:
             if self.is_stop:
                 return
             status_progress_updater(f"正在获取{url_type}信息...", progress)
-            videos = channel_processor.get_channel_videos(id, url_type)
-            
-            if not videos:
-                if self.is_stop:
-                    return
-                status_progress_updater("未找到视频", progress)
-                return
+            # 流式获取视频列表，第一页解析完成即可开始处理，后续页面边处理边加载
+            if incremental:
+                videos = self.channel_sync.iter_new_videos(id, url_type)
+            else:
+                videos = channel_processor.iter_channel_videos(id, url_type)
             
-            # 保存处理数据
-
             # 2. 处理每个视频
-            total_videos = len(videos)
+            total_videos = 0
             for i, video in enumerate(videos):
-                progress = 0.1 + (i / total_videos) * 0.8
+                total_videos = i + 1
+                # 视频总数在遍历结束前未知，进度按已处理数量逐步逼近
+                progress = 0.1 + (i / (i + 1)) * 0.8
                 if self.is_stop:
                     return
-                status_progress_updater(f"正在处理视频 {i+1}/{total_videos}: {video['title']}", progress)
+                status_progress_updater(f"正在处理视频 {i+1}: {video['title']}", progress)
+                usage_tracker.begin_video(video['video_id'])
                 
                 # 获取字幕
                 transcript = subtitle_processor.get_video_transcript_multiple_languages(video['video_id'])
@@ -265,11 +354,34 @@ class MainWindow:
                 for entry in transcript:
                     full_text += entry['text'] + "\n"
                 
-                # 一次性翻译整个文本
-                translated_full_text = translator.translate(full_text)
+                # 摘要直接由原文生成（输出为中文），不必等待翻译完成，两者同时进行
+                # 跳过视频或停止处理时通过 summary_cancel 通知摘要停止发送新的请求
+                summary_cancel = threading.Event()
+                summary_future = summary_executor.submit(summarizer.summarize_long_text, full_text, 300, cancel_event=summary_cancel)
+                
+                # 按行切分为受 token 预算限制的块并发翻译，避免长视频超出模型输出上限
+                # 译文流式返回，边生成边显示在字幕区域
+                self._begin_stream()
+                translated_parts = []
+                stream = translator.translate_long_text_stream(full_text)
+                try:
+                    for delta in stream:
+                        if self.is_stop:
+                            return
+                        translated_parts.append(delta)
+                        self._receive_stream_delta(delta)
+                except ValueError as e:
+                    # 输出异常时已取消请求，跳过该视频
+                    status_progress_updater(f"视频 {video['title']} 翻译异常，已跳过: {e}", progress)
+                    summary_cancel.set()
+                    summary_future.cancel()
+                    continue
+                finally:
+                    stream.close()
+                translated_full_text = "".join(translated_parts)
                 
-                # 生成摘要
-                summary = summarizer.summarize(translated_full_text, max_length=300)
+                # 等待与翻译同时生成的摘要
+                summary = summary_future.result()
                 
                 # 保存处理结果
                 processed_video = video.copy()
@@ -281,21 +393,48 @@ class MainWindow:
                 # 发送处理后的视频数据
                 video_receiver(processed_video)
                 
+                # 记录已处理的视频，增量同步时跳过
+                self.channel_sync.mark_processed(id, url_type, video['video_id'])
+                
                 # 更新视频列表
                 # self.root.after(0, self._add_video_to_list, processed_video['title'], i)
             
             # 3. 完成处理
-            progress = 1.0
             if self.is_stop:
                 return
-            status_progress_updater(f"处理完成，共处理 {total_videos} 个视频", progress)
+            if not total_videos:
+                status_progress_updater("没有新视频" if incremental else "未找到视频", progress)
+                return
+            progress = 1.0
+            total_usage = usage_tracker.get_summary()["total"]
+            status_progress_updater(
+                f"处理完成，共处理 {total_videos} 个视频，调用大模型 {total_usage['calls']} 次，"
+                f"消耗 {total_usage['total_tokens']} tokens"
+                + (f"，约 {total_usage['cost']:.4f} 元" if total_usage['cost'] is not None else ""),
+                progress
+            )
+            self._save_usage(usage_tracker)
             
         except Exception as e:
             status_progress_updater(f"处理失败: {str(e)}", progress)
             messagebox.showerror("错误", f"处理失败: {str(e)}")
         finally:
+            if summary_cancel:
+                summary_cancel.set()
+            summary_executor.shutdown(wait=False, cancel_futures=True)
             finish_callback()
     
+    def _save_usage(self, usage_tracker):
+        """
+        将本次处理的大模型用量保存到缓存目录的 usage 子目录
+        """
+        usage_dir = os.path.join(self.cache_dir, "usage")
+        try:
+            os.makedirs(usage_dir, exist_ok=True)
+            usage_tracker.export_json(os.path.join(usage_dir, time.strftime("usage_%Y%m%d_%H%M%S.json")))
+        except OSError as e:
+            print(f"保存用量统计失败: {e}")
+    
     def _update_status(self, status):
         """
         更新状态信息
@@ -321,6 +460,7 @@ class MainWindow:
         selection = self.video_listbox.curselection()
         if selection:
             index = selection[0]
+            self._user_selected_video = True
             self._display_video(index)
     
     def _display_video(self, index):
@@ -331,6 +471,7 @@ class MainWindow:
             return
         
         video = self.processed_data['videos'][index]
+        self._streaming_view = False
         
         # 显示摘要
         self.summary_text.configure(state=tk.NORMAL)
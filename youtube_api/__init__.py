@@ -1,5 +1,9 @@
 # YouTube API模块
 from .channel import ChannelProcessor
 from .subtitle import SubtitleProcessor
+from .http_session import HttpSession
+from .metadata_cache import MetadataCache
+from .transcript_cache import TranscriptCache
+from .channel_sync import ChannelSync
 
-__all__ = ['ChannelProcessor', 'SubtitleProcessor']
+__all__ = ['ChannelProcessor', 'SubtitleProcessor', 'HttpSession', 'MetadataCache', 'TranscriptCache', 'ChannelSync']
@@ -1,11 +1,33 @@
 import re
-import json
-import requests
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 import pytube
+from .http_session import HttpSession
+from .initial_data import extract_initial_data, iter_values, iter_path, get_path
+from .watch_metadata import WATCH_FIELDS, parse_watch_metadata
 
 class ChannelProcessor:
-    def __init__(self):
+    def __init__(self, max_workers=8, max_per_host=4, requests_per_second=10, session=None, cache=None):
+        """
+        初始化频道处理器
+        
+        参数:
+            max_workers: 并发获取视频信息时的最大线程数（同时在途的请求数上限）
+            max_per_host: 对同一主机同时发出的最大请求数
+            requests_per_second: 全局每秒请求数上限
+            session: 共享的 HttpSession，为 None 时自动创建
+            cache: 元数据缓存 MetadataCache，为 None 时不使用缓存
+        """
+        self.max_workers = max_workers
+        self.cache = cache
+        self.session = session or HttpSession(
+            pool_size=max_workers,
+            max_per_host=max_per_host,
+            requests_per_second=requests_per_second
+        )
+        # 记录获取失败的视频，元素为 (video_id, 异常)
+        self.failed_videos = []
         self.url_patterns = {
             'channel': [
                 r'(?:https?://)?(?:www\.)?youtube\.com/@([a-zA-Z0-9_-]+)'
@@ -18,6 +40,12 @@ class ChannelProcessor:
             ]
         }
     
+    def reset_failed_videos(self):
+        """
+        清空获取失败的视频记录，每次开始新的遍历时调用
+        """
+        self.failed_videos = []
+    
     def get_url_type_and_id(self, url):
         """
         从YouTube URL中提取类型和ID
@@ -42,23 +70,40 @@ class ChannelProcessor:
         
         raise ValueError("无法从URL中提取频道ID或用户名")
     
+    def get_channel_uploads_playlist_id(self, channel_id):
+        """
+        获取频道"全部上传"播放列表的ID，该播放列表按上传时间从新到旧排列
+        
+        参数:
+            channel_id: 频道用户名（@ 之后的部分）
+            
+        返回:
+            str: 上传播放列表ID，无法识别频道时返回 None
+        """
+        response = self.session.get(f"https://www.youtube.com/@{channel_id}", timeout=15)
+        if response.status_code != 200:
+            raise ValueError(f"无法访问频道页面，状态码: {response.status_code}")
+        
+        yt_initial_data = extract_initial_data(response.text)
+        external_id = get_path(yt_initial_data, ('metadata', 'channelMetadataRenderer', 'externalId')) if yt_initial_data else None
+        if not external_id:
+            match = re.search(r'"(?:externalId|channelId)"\s*:\s*"(UC[a-zA-Z0-9_-]+)"', response.text)
+            external_id = match.group(1) if match else None
+        
+        # 频道ID以 UC 开头，对应的上传播放列表ID以 UU 开头
+        if not external_id or not external_id.startswith("UC"):
+            print(f"无法识别频道 {channel_id} 的ID")
+            return None
+        return "UU" + external_id[2:]
+    
     def get_channel_playlists(self, channel_id):
         """
         获取频道下的所有播放列表
         """
         playlists = []
         
-        # 设置请求头，模拟真实浏览器，移除 Accept-Encoding 让 requests 自动处理压缩
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1"
-        }
-        
-            # 直接从网络获取播放列表页面，添加超时设置
-        response = requests.get(f"https://www.youtube.com/@{channel_id}/playlists", headers=headers, timeout=15)
+        # 直接从网络获取播放列表页面，添加超时设置（请求头和压缩由共享会话统一处理）
+        response = self.session.get(f"https://www.youtube.com/@{channel_id}/playlists", timeout=15)
         
         if response.status_code != 200:
             raise ValueError(f"无法访问频道的播放列表页面，状态码: {response.status_code}")
@@ -68,66 +113,38 @@ class ChannelProcessor:
         html_text = response.text
         
         # 提取ytInitialData对象
-        yt_initial_data_match = re.search(r'var ytInitialData = ({.*?});', html_text, re.DOTALL)
-        
-        if yt_initial_data_match:
-            yt_initial_data_str = yt_initial_data_match.group(1)
-            try:
-                yt_initial_data = json.loads(yt_initial_data_str)
+        yt_initial_data = extract_initial_data(html_text)
+        
+        if yt_initial_data is None:
+            print("无法解析ytInitialData")
+        else:
+            # 按路径直接定位各标签页中的 gridRenderer，查找包含播放列表的部分
+            grid_items_path = (
+                'contents', 'twoColumnBrowseResultsRenderer', 'tabs', '*',
+                'tabRenderer', 'content', 'sectionListRenderer', 'contents', '*',
+                'itemSectionRenderer', 'contents', '*', 'gridRenderer', 'items'
+            )
+            for items in iter_path(yt_initial_data, grid_items_path):
+                # 检查items中是否包含lockupViewModel（新结构）
+                if not any('lockupViewModel' in grid_item for grid_item in items):
+                    continue
                 
-                # 解析播放列表数据
-                # 查找播放列表所在的section
-                contents = yt_initial_data.get('contents', {})
-                two_column_browse_results_renderer = contents.get('twoColumnBrowseResultsRenderer', {})
-                tabs = two_column_browse_results_renderer.get('tabs', [])
-                
-                for tab in tabs:
-                    has_playlists = False  # 初始化变量
-                    tab_renderer = tab.get('tabRenderer', {})
-                    content = tab_renderer.get('content', {})
-                    section_list_renderer = content.get('sectionListRenderer', {})
-                    contents = section_list_renderer.get('contents', [])
+                # 这是播放列表标签
+                for grid_item in items:
+                    lockup_view_model = grid_item.get('lockupViewModel', {})
+                    # 从contentId获取playlistId，从metadata中获取标题
+                    playlist_id = lockup_view_model.get('contentId', '')
+                    title = get_path(lockup_view_model, ('metadata', 'lockupMetadataViewModel', 'title', 'content'), '')
                     
-                    # 遍历内容，查找包含gridRenderer的部分
-                    for content_item in contents:
-                        item_section_renderer = content_item.get('itemSectionRenderer', {})
-                        item_contents = item_section_renderer.get('contents', [])
-                        
-                        for item in item_contents:
-                            grid_renderer = item.get('gridRenderer', {})
-                            items = grid_renderer.get('items', [])
-                            
-                            # 检查items中是否包含lockupViewModel（新结构）
-                            if any('lockupViewModel' in grid_item for grid_item in items):
-                                has_playlists = True
-                                # 这是播放列表标签
-                                for grid_item in items:
-                                    lockup_view_model = grid_item.get('lockupViewModel', {})
-                                    if lockup_view_model:
-                                        # 提取播放列表信息
-                                        # 从contentId获取playlistId
-                                        playlist_id = lockup_view_model.get('contentId', '')
-                                        
-                                        # 从metadata中获取标题
-                                        metadata = lockup_view_model.get('metadata', {})
-                                        lockup_metadata = metadata.get('lockupMetadataViewModel', {})
-                                        title_obj = lockup_metadata.get('title', {})
-                                        title = title_obj.get('content', '')
-                                        
-                                        if playlist_id and title:
-                                            playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
-                                            playlists.append({
-                                                "id": playlist_id,
-                                                "url": playlist_url,
-                                                "title": title
-                                            })
-                                break  # 找到播放列表后退出循环
-                        if has_playlists:
-                            break  # 找到播放列表后退出循环
-                    if has_playlists:
-                        break  # 找到播放列表后退出循环
-            except json.JSONDecodeError:
-                print("无法解析ytInitialData")
+                    if playlist_id and title:
+                        playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
+                        playlists.append({
+                            "id": playlist_id,
+                            "url": playlist_url,
+                            "title": title
+                        })
+                break  # 找到播放列表后退出循环
+        
         # 去重，确保每个播放列表只添加一次
         unique_playlists = []
         seen_ids = set()
@@ -138,104 +155,339 @@ class ChannelProcessor:
         
         return unique_playlists
     
-    def get_playlist_videos(self, playlist_id):
+    def get_playlist_videos(self, playlist_id, fetch_details=False):
         """
         获取播放列表中的所有视频
+        
+        参数:
+            playlist_id: 播放列表ID
+            fetch_details: 是否同时补全描述和发布日期（需要为每个视频请求观看页面）
         """
-        videos = []
+        return list(self.iter_playlist_videos(playlist_id, fetch_details))
+    
+    def iter_playlist_videos(self, playlist_id, fetch_details=False):
+        """
+        逐页遍历播放列表中的视频，每获取一页就立即产出该页的视频
         
+        视频的标题、时长和缩略图直接取自 ytInitialData，只有缺失的字段才会请求
+        视频观看页面补全。播放列表超过一页时，按 continuation token 继续请求后续页面。
+        
+        参数:
+            playlist_id: 播放列表ID
+            fetch_details: 是否同时补全描述和发布日期（需要为每个视频请求观看页面）
+            
+        返回:
+            generator: 逐个产出视频信息字典
+        """
         # 直接解析播放列表网页获取视频，不使用pytube.Playlist
         playlist_url = f"https://www.youtube.com/playlist?list={playlist_id}"
         print(f"播放列表 URL: {playlist_url}")
         
-        # 设置请求头，模拟真实浏览器
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1"
-        }
+        fields = ["title"]
+        if fetch_details:
+            fields.extend(["description", "publish_date"])
+        
+        # 缓存有效时直接使用上次完整遍历的结果，过期时用条件请求重新验证
+        entry = self.cache.get("playlist", playlist_id) if self.cache else None
+        if entry and entry["fresh"]:
+            print(f"使用缓存的播放列表 {playlist_id}，共 {len(entry['value'])} 个视频")
+            yield from self.complete_videos(entry["value"], fields)
+            return
         
         # 获取播放列表页面
-        response = requests.get(playlist_url, headers=headers, timeout=15)
+        request_headers = self.cache.validator_headers(entry) if entry else {}
+        response = self.session.get(playlist_url, headers=request_headers, timeout=15)
+        if response.status_code == 304 and entry:
+            self.cache.touch("playlist", playlist_id)
+            print(f"播放列表 {playlist_id} 未变化，使用缓存")
+            yield from self.complete_videos(entry["value"], fields)
+            return
         if response.status_code != 200:
             print(f"无法访问播放列表页面，状态码: {response.status_code}")
-            return videos
+            return
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
         
         # 提取ytInitialData
-        yt_initial_data_match = re.search(r'var ytInitialData = ({.*?});', response.text, re.DOTALL)
-        if not yt_initial_data_match:
+        yt_initial_data = extract_initial_data(response.text)
+        if yt_initial_data is None:
             print("未找到ytInitialData")
-            return videos
+            return
+        
+        # 后续分页请求需要页面中的 InnerTube 配置
+        api_key_match = re.search(r'"INNERTUBE_API_KEY"\s*:\s*"([^"]+)"', response.text)
+        client_version_match = re.search(r'"INNERTUBE_CLIENT_VERSION"\s*:\s*"([^"]+)"', response.text)
+        browse_url = "https://www.youtube.com/youtubei/v1/browse"
+        if api_key_match:
+            browse_url += f"?key={api_key_match.group(1)}"
+        client_context = {
+            "client": {
+                "clientName": "WEB",
+                "clientVersion": client_version_match.group(1) if client_version_match else "2.20240101.00.00",
+                "hl": "en",
+            }
+        }
         
-        yt_initial_data = json.loads(yt_initial_data_match.group(1))
-        
-        # 查找视频列表
-        def find_video_ids(data):
-            video_ids = []
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    if key == "videoId":
-                        video_ids.append(value)
-                    video_ids.extend(find_video_ids(value))
-            elif isinstance(data, list):
-                for item in data:
-                    video_ids.extend(find_video_ids(item))
-            return video_ids
-        
-        video_ids = find_video_ids(yt_initial_data)
-        # 去重
-        video_ids = list(set(video_ids))
-        
-        print(f"解析到 {len(video_ids)} 个视频 ID")
-        
-        # 构建视频信息
-        for video_id in video_ids:
-            video_info = self.get_single_video(video_id)
-            if video_info:
+        all_videos = []
+        complete = True
+        seen_ids = set()
+        seen_tokens = set()
+        page_data = yt_initial_data
+        page_number = 1
+        while True:
+            videos, continuation_token = self._parse_playlist_page(page_data, seen_ids)
+            
+            # 页面结构变化时退回到只提取视频ID，缺失的信息从观看页面补全
+            if page_number == 1 and not videos:
+                for video_id in dict.fromkeys(iter_values(page_data, "videoId")):
+                    seen_ids.add(video_id)
+                    videos.append(self._empty_video(video_id))
+            
+            print(f"第 {page_number} 页解析到 {len(videos)} 个视频")
+            for video in self.complete_videos(videos, fields):
+                all_videos.append(dict(video))
+                yield video
+            
+            if not continuation_token or continuation_token in seen_tokens:
+                break
+            seen_tokens.add(continuation_token)
+            
+            # 请求下一页
+            response = self.session.post(
+                browse_url,
+                json={"context": client_context, "continuation": continuation_token},
+                timeout=15
+            )
+            if response.status_code != 200:
+                print(f"无法获取播放列表下一页，状态码: {response.status_code}")
+                complete = False
+                break
+            try:
+                page_data = response.json()
+            except ValueError as e:
+                print(f"无法解析播放列表下一页: {e}")
+                complete = False
+                break
+            page_number += 1
+        
+        # 只缓存完整遍历的播放列表
+        if self.cache and complete:
+            self.cache.put("playlist", playlist_id, all_videos, etag, last_modified)
+    
+    def _parse_playlist_page(self, page_data, seen_ids):
+        """
+        解析播放列表的一页数据（首页的 ytInitialData 或分页接口的响应）
+        
+        参数:
+            page_data: 页面 JSON 数据
+            seen_ids: 已产出的视频ID集合，用于跨页去重，会被原地更新
+            
+        返回:
+            tuple: (videos, continuation_token)，没有下一页时 continuation_token 为 None
+        """
+        videos = []
+        for renderer in iter_values(page_data, "playlistVideoRenderer", descend=False):
+            video_info = self._build_video_from_renderer(renderer)
+            if video_info and video_info["video_id"] not in seen_ids:
+                seen_ids.add(video_info["video_id"])
                 videos.append(video_info)
         
-        return videos
+        continuation_token = None
+        for continuation_item in iter_values(page_data, "continuationItemRenderer", descend=False):
+            for command in iter_values(continuation_item, "continuationCommand"):
+                if isinstance(command, dict) and command.get("token"):
+                    continuation_token = command["token"]
+                    break
+            if continuation_token:
+                break
+        
+        return videos, continuation_token
     
-    def get_single_video(self, video_id):
+    def _empty_video(self, video_id):
         """
-        获取单个视频的详细信息
+        构建只包含视频ID的视频信息，其余字段为 None 表示尚未获取
+        """
+        return {
+            "title": None,
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "video_id": video_id,
+            "publish_date": None,
+            "description": None,
+            "duration": None,
+            "thumbnail": None,
+        }
+    
+    def _build_video_from_renderer(self, renderer):
         """
+        从播放列表条目（playlistVideoRenderer）构建视频信息
         
-        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        参数:
+            renderer: playlistVideoRenderer 字典
+            
+        返回:
+            dict: 视频信息，无法识别时返回 None
+        """
+        video_id = renderer.get("videoId") if isinstance(renderer, dict) else None
+        if not video_id:
+            return None
         
-        # 使用 requests 获取视频页面，避免依赖 pytube
-        # requests 和 BeautifulSoup 已在文件开头导入
+        video_info = self._empty_video(video_id)
         
-        # 设置请求头，模拟浏览器访问
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        # 标题可能是 runs 列表或 simpleText
+        title_obj = renderer.get("title", {})
+        title = title_obj.get("simpleText") or "".join(run.get("text", "") for run in title_obj.get("runs", []))
+        if title:
+            video_info["title"] = title
         
-        # 获取视频页面
-        response = requests.get(video_url, headers=headers, timeout=10)
-        response.raise_for_status()
+        length_seconds = renderer.get("lengthSeconds")
+        if length_seconds and str(length_seconds).isdigit():
+            video_info["duration"] = int(length_seconds)
         
-        # 解析 HTML
-        soup = BeautifulSoup(response.text, "html.parser")
+        # 取分辨率最高的缩略图
+        thumbnails = renderer.get("thumbnail", {}).get("thumbnails", [])
+        if thumbnails:
+            video_info["thumbnail"] = thumbnails[-1].get("url")
         
-        # 获取视频标题
-        title = soup.find("title").text if soup.find("title") else f"视频 {video_id}"
-        # 移除标题中的 " - YouTube"
-        title = title.replace(" - YouTube", "")
+        return video_info
+    
+    def complete_videos(self, videos, fields=("description", "publish_date")):
+        """
+        为缺失指定字段的视频请求观看页面并补全信息
+        
+        只有至少缺失一个字段（值为 None）的视频才会发起请求，已有的字段不会被覆盖。
+        获取失败的视频会保留在结果中，并记录到 failed_videos。
+        
+        参数:
+            videos: 视频信息列表
+            fields: 需要补全的字段
+            
+        返回:
+            list: 补全后的视频信息列表，顺序与输入一致
+        """
+        missing = [video for video in videos if any(video.get(field) is None for field in fields)]
+        if not missing:
+            return videos
+        
+        # 只读取页面中缺失字段所在的部分
+        needed_fields = [field for field in fields if field in WATCH_FIELDS]
+        details, failures = self.get_videos([video["video_id"] for video in missing], fields=needed_fields)
+        self.failed_videos.extend(failures)
+        
+        details_by_id = {detail["video_id"]: detail for detail in details}
+        for video in missing:
+            detail = details_by_id.get(video["video_id"])
+            for field in fields:
+                if video.get(field) is None and detail:
+                    video[field] = detail.get(field)
+            if video.get("title") is None:
+                video["title"] = f"视频 {video['video_id']}"
+        
+        return videos
+    
+    def get_videos(self, video_ids, max_workers=None, fields=WATCH_FIELDS):
+        """
+        并发获取多个视频的详细信息
+        
+        参数:
+            video_ids: 视频ID列表
+            max_workers: 最大并发数，默认使用初始化时设置的 max_workers
+            fields: 需要从观看页面获取的字段，取值见 WATCH_FIELDS
+            
+        返回:
+            tuple: (videos, failures)，videos 保持 video_ids 的顺序，
+                   failures 为获取失败的 (video_id, 异常) 列表
+        """
+        videos = []
+        failures = []
+        if not video_ids:
+            return videos, failures
+        
+        max_workers = max_workers or self.max_workers
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.get_single_video, video_id, fields) for video_id in video_ids]
+            # 按提交顺序收集结果，保证输出顺序与播放列表一致
+            for video_id, future in zip(video_ids, futures):
+                try:
+                    video_info = future.result()
+                except Exception as e:
+                    print(f"获取视频 {video_id} 信息失败: {e}")
+                    failures.append((video_id, e))
+                    continue
+                if video_info:
+                    videos.append(video_info)
+        
+        return videos, failures
+    
+    def get_single_video(self, video_id, fields=WATCH_FIELDS, lightweight=True):
+        """
+        获取单个视频的详细信息
         
-        # 获取视频描述（尝试从 meta 标签或页面内容中获取）
-        description = ""
-        meta_description = soup.find("meta", property="og:description")
-        if meta_description:
-            description = meta_description.get("content", "")
+        参数:
+            video_id: 视频ID
+            fields: 需要获取的字段，取值见 WATCH_FIELDS，只在轻量模式下生效
+            lightweight: 是否使用轻量模式。轻量模式流式读取页面，获取到所需的
+                         <title>/<meta> 后立即停止，不构建完整的 BeautifulSoup 文档树
+        """
         
-        # 获取发布日期（尝试从 meta 标签中获取）
-        publish_date = None
-        meta_publish_date = soup.find("meta", itemprop="datePublished")
-        if meta_publish_date:
-            publish_date = meta_publish_date.get("content", None)
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
+        fields = tuple(fields)
+        
+        # 缓存中已有所需字段时直接返回，过期则带上验证信息发起条件请求
+        request_headers = {}
+        entry = self.cache.get("video", video_id) if self.cache else None
+        if entry and set(fields) <= set(entry["value"]["fields"]):
+            if entry["fresh"]:
+                return dict(entry["value"]["video"])
+            request_headers = self.cache.validator_headers(entry)
+        
+        if lightweight:
+            # 流式获取视频页面，只读取到所需字段为止
+            response = self.session.get(video_url, headers=request_headers, timeout=10, stream=True)
+            try:
+                if response.status_code == 304 and entry:
+                    self.cache.touch("video", video_id)
+                    return dict(entry["value"]["video"])
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                chunks = (decoder.decode(chunk) for chunk in response.iter_content(chunk_size=16 * 1024))
+                metadata = parse_watch_metadata(chunks, fields)
+            finally:
+                # 提前结束读取时关闭响应，剩余内容不再下载
+                response.close()
+            
+            # 未请求的字段保持为 None，表示尚未获取
+            title = metadata.get("title") or f"视频 {video_id}"
+            description = metadata.get("description", "" if "description" in fields else None)
+            publish_date = metadata.get("publish_date")
+        else:
+            # 通过共享会话获取视频页面，避免依赖 pytube
+            response = self.session.get(video_url, headers=request_headers, timeout=10)
+            if response.status_code == 304 and entry:
+                self.cache.touch("video", video_id)
+                return dict(entry["value"]["video"])
+            response.raise_for_status()
+            fields = WATCH_FIELDS
+            
+            # 解析 HTML
+            soup = BeautifulSoup(response.text, "html.parser")
+            
+            # 获取视频标题
+            title = soup.find("title").text if soup.find("title") else f"视频 {video_id}"
+            
+            # 获取视频描述（尝试从 meta 标签或页面内容中获取）
+            description = ""
+            meta_description = soup.find("meta", property="og:description")
+            if meta_description:
+                description = meta_description.get("content", "")
+            
+            # 获取发布日期（尝试从 meta 标签中获取）
+            publish_date = None
+            meta_publish_date = soup.find("meta", itemprop="datePublished")
+            if meta_publish_date:
+                publish_date = meta_publish_date.get("content", None)
+        
+        # 移除标题中的 " - YouTube"
+        title = title.replace(" - YouTube", "")
         
         # 添加视频信息到列表
         video_info = {
@@ -246,39 +498,67 @@ class ChannelProcessor:
             "description": description,
         }
         
-        return video_info
+        if self.cache:
+            # 与缓存中已有的字段合并，记录已获取过的字段
+            cached_fields = set(fields)
+            if entry:
+                cached_video = entry["value"]["video"]
+                for field in WATCH_FIELDS:
+                    if field not in fields and field in entry["value"]["fields"]:
+                        video_info[field] = cached_video.get(field)
+                cached_fields.update(entry["value"]["fields"])
+            self.cache.put(
+                "video",
+                video_id,
+                {"video": video_info, "fields": sorted(cached_fields)},
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified")
+            )
+        
+        return dict(video_info)
     
-    def get_channel_videos(self, id, id_type='channel'):
+    def get_channel_videos(self, id, id_type='channel', fetch_details=False):
         """
         获取频道、播放列表或单个视频中的所有视频
         
         参数:
             id: 频道ID、播放列表ID或视频ID
             id_type: 'channel', 'playlist', 或 'video'
+            fetch_details: 是否为播放列表中的视频补全描述和发布日期
         """
-        videos = []
+        return list(self.iter_channel_videos(id, id_type, fetch_details))
+    
+    def iter_channel_videos(self, id, id_type='channel', fetch_details=False):
+        """
+        逐个产出频道、播放列表或单个视频中的视频，播放列表按页流式获取
         
+        参数:
+            id: 频道ID、播放列表ID或视频ID
+            id_type: 'channel', 'playlist', 或 'video'
+            fetch_details: 是否为播放列表中的视频补全描述和发布日期
+            
+        返回:
+            generator: 逐个产出视频信息字典，获取失败的视频记录在 failed_videos 中
+        """
+        self.reset_failed_videos()
         if id_type == 'channel':
             # 处理频道：先获取所有播放列表
             playlists = self.get_channel_playlists(id)
             
             if not playlists:
                 print(f"频道 {id} 下没有找到播放列表")
-                return videos
+                return
             
             # 遍历每个播放列表获取视频
             for playlist in playlists:
                 print(f"正在获取播放列表 {playlist['title']} ({playlist['id']}) 中的视频")
-                playlist_videos = self.get_playlist_videos(playlist['id'])
-                videos.extend(playlist_videos)
+                yield from self.iter_playlist_videos(playlist['id'], fetch_details)
         elif id_type == 'playlist':
             # 处理播放列表
-            videos = self.get_playlist_videos(id)
+            yield from self.iter_playlist_videos(id, fetch_details)
         elif id_type == 'video':
             # 处理单个视频
-            videos.append(self.get_single_video(id))
-        
-        return videos
+            yield self.get_single_video(id)
     
     def get_video_info(self, video_url):
         """
@@ -292,3 +572,4 @@ class ChannelProcessor:
             "publish_date": yt.publish_date,
             "description": yt.description
         }
+
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+
+class ChannelSync:
+    """
+    频道增量同步，记录每个频道已处理的视频，只产出新上传和上次未处理完的视频
+    
+    频道同步的是按上传时间从新到旧排列的"全部上传"播放列表：遇到已处理的视频即停止遍历，
+    不再请求后续分页。已交出但没有处理完的视频（获取字幕失败、处理中途停止等）记录为待处理，
+    下次同步时会继续查找并重新产出。
+    """
+    
+    def __init__(self, channel_processor, state_dir):
+        """
+        初始化增量同步
+        
+        参数:
+            channel_processor: 用于获取播放列表和视频的 ChannelProcessor
+            state_dir: 保存同步状态的目录，每个频道/播放列表一个 JSON 文件
+        """
+        self.channel_processor = channel_processor
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+        self._states = {}
+    
+    def _state_path(self, id, id_type):
+        safe_id = re.sub(r'[^a-zA-Z0-9_-]', '_', id)
+        return os.path.join(self.state_dir, f"{id_type}_{safe_id}.json")
+    
+    def load_state(self, id, id_type='channel'):
+        """
+        读取同步状态
+        
+        参数:
+            id: 频道ID、播放列表ID或视频ID
+            id_type: 'channel', 'playlist', 或 'video'
+            
+        返回:
+            dict: 包含 pending（播放列表ID -> 已交出但尚未处理完的视频ID列表）
+                  和 processed（已处理的视频ID集合）
+        """
+        key = (id_type, id)
+        if key not in self._states:
+            state = {"pending": {}, "processed": set()}
+            path = self._state_path(id, id_type)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    state["pending"] = data.get("pending", {})
+                    state["processed"] = set(data.get("processed", []))
+                except (OSError, ValueError) as e:
+                    print(f"读取同步状态失败，将重新同步: {e}")
+            self._states[key] = state
+        return self._states[key]
+    
+    def save_state(self, id, id_type='channel'):
+        """
+        保存同步状态，先写临时文件再替换，避免中断时损坏状态文件；已处理的视频排序后保存
+        
+        参数:
+            id: 频道ID、播放列表ID或视频ID
+            id_type: 'channel', 'playlist', 或 'video'
+        """
+        state = self.load_state(id, id_type)
+        path = self._state_path(id, id_type)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"pending": state["pending"], "processed": sorted(state["processed"])}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    
+    def mark_processed(self, id, id_type, video_id):
+        """
+        记录已处理完成的视频
+        
+        参数:
+            id: 频道ID、播放列表ID或视频ID
+            id_type: 'channel', 'playlist', 或 'video'
+            video_id: 已处理的视频ID
+        """
+        state = self.load_state(id, id_type)
+        if video_id not in state["processed"]:
+            state["processed"].add(video_id)
+            self.save_state(id, id_type)
+    
+    def iter_new_videos(self, id, id_type='channel'):
+        """
+        逐个产出上次同步后新增的视频，以及之前交出但没有处理完的视频
+        
+        频道优先同步"全部上传"播放列表；无法获取时退回到频道的各个播放列表，
+        这些播放列表不一定按上传时间排列，需要完整遍历。
+        按时间排列的播放列表遇到已处理的视频即停止，还有待处理的视频没有找到时继续向后查找。
+        视频在调用 mark_processed 之前都保持待处理状态，中途停止时下次同步仍会重新产出。
+        
+        参数:
+            id: 频道ID、播放列表ID或视频ID
+            id_type: 'channel', 'playlist', 或 'video'
+            
+        返回:
+            generator: 逐个产出视频信息字典
+        """
+        self.channel_processor.reset_failed_videos()
+        state = self.load_state(id, id_type)
+        processed = set(state["processed"])
+        
+        if id_type == 'video':
+            if id not in processed:
+                yield self.channel_processor.get_single_video(id)
+            return
+        
+        ordered = True
+        if id_type == 'channel':
+            uploads_id = self.channel_processor.get_channel_uploads_playlist_id(id)
+            if uploads_id:
+                playlist_ids = [uploads_id]
+            else:
+                playlist_ids = [playlist['id'] for playlist in self.channel_processor.get_channel_playlists(id)]
+                ordered = False
+        else:
+            playlist_ids = [id]
+        
+        yielded_ids = set()
+        for playlist_id in playlist_ids:
+            pending_ids = state["pending"].setdefault(playlist_id, [])
+            pending = set(pending_ids) - processed
+            new_count = 0
+            for video in self.channel_processor.iter_playlist_videos(playlist_id):
+                video_id = video['video_id']
+                if video_id in processed:
+                    # 后面的视频都比它旧，只有还在查找待处理的视频时才继续
+                    if ordered and not pending:
+                        break
+                    continue
+                pending.discard(video_id)
+                # 同一视频可能出现在多个播放列表中
+                if video_id in yielded_ids:
+                    continue
+                yielded_ids.add(video_id)
+                new_count += 1
+                # 交出前先记为待处理，处理完成前中断也不会丢失
+                if video_id not in pending_ids:
+                    pending_ids.append(video_id)
+                    self.save_state(id, id_type)
+                yield video
+            
+            print(f"播放列表 {playlist_id} 有 {new_count} 个待处理视频")
+            # 只保留本次仍在播放列表中且没有处理完的视频
+            state["pending"][playlist_id] = [
+                video_id for video_id in pending_ids
+                if video_id in yielded_ids and video_id not in state["processed"]
+            ]
+            self.save_state(id, id_type)
@@ -0,0 +1,159 @@
+import random
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .rate_limiter import TokenBucket
+
+# 只有安装了 brotli 时 urllib3 才能解码 br 压缩的响应
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# 模拟真实浏览器的默认请求头
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+
+class _JitteredRetry(Retry):
+    """
+    在指数退避的基础上加入随机抖动（full jitter），避免并发请求同时重试
+    """
+    
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return random.uniform(0, backoff)
+
+
+class HttpSession:
+    """
+    共享的HTTP会话，提供连接池复用、自动解压、失败重试和全局限速
+    """
+    
+    def __init__(self, pool_size=8, max_per_host=4, requests_per_second=10, max_retries=3, backoff_factor=1.0):
+        """
+        初始化HTTP会话
+        
+        参数:
+            pool_size: 每个主机保持的长连接数量，应不小于并发线程数
+            max_per_host: 对同一主机同时发出的最大请求数
+            requests_per_second: 全局每秒请求数上限，为 None 或 0 时不限速
+            max_retries: 遇到 429/5xx 或连接错误时的最大重试次数
+            backoff_factor: 重试退避系数，第 n 次重试最多等待 backoff_factor * 2^(n-1) 秒
+        """
+        self.max_per_host = max_per_host
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
+        
+        retry = _JitteredRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max(pool_size, max_per_host),
+            max_retries=retry
+        )
+        
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def _host_slot(self, url):
+        """
+        获取限制单个主机并发请求数的信号量
+        
+        参数:
+            url: 请求的URL
+            
+        返回:
+            threading.BoundedSemaphore: 该主机对应的信号量，可用于 with 语句
+        """
+        host = urlparse(url).netloc
+        with self._host_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._host_semaphores[host] = semaphore
+        return semaphore
+    
+    def request(self, method, url, **kwargs):
+        """
+        发送HTTP请求，先经过全局限速和单主机并发限制
+        
+        stream=True 时响应内容尚未下载，单主机的并发名额保留到调用方关闭响应时才释放，
+        因此调用方必须关闭流式响应。
+        
+        参数:
+            method: 请求方法
+            url: 请求的URL
+            **kwargs: 传递给 requests.Session.request 的其他参数
+            
+        返回:
+            requests.Response: 响应对象
+        """
+        semaphore = self._host_slot(url)
+        semaphore.acquire()
+        try:
+            self.rate_limiter.acquire()
+            response = self.session.request(method, url, **kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+        
+        if not kwargs.get("stream"):
+            semaphore.release()
+            return response
+        
+        close = response.close
+        released = threading.Event()
+        
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released.is_set():
+                    released.set()
+                    semaphore.release()
+        
+        response.close = close_and_release
+        return response
+    
+    def get(self, url, **kwargs):
+        """
+        发送GET请求
+        """
+        return self.request("GET", url, **kwargs)
+    
+    def post(self, url, **kwargs):
+        """
+        发送POST请求
+        """
+        return self.request("POST", url, **kwargs)
+    
+    def close(self):
+        """
+        关闭会话并释放连接池
+        """
+        self.session.close()
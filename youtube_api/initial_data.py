@@ -0,0 +1,115 @@
+import json
+
+_decoder = json.JSONDecoder()
+
+
+def extract_initial_data(html, name="ytInitialData"):
+    """
+    从页面HTML中提取 ytInitialData 等内嵌的JSON对象
+    
+    只定位赋值语句的位置，然后用 json.JSONDecoder.raw_decode 从该处精确解码一个JSON值，
+    不会像非贪婪正则那样在字符串内的 "};" 处提前截断，也不需要对整页做回溯匹配。
+    
+    参数:
+        html: 页面HTML文本
+        name: 变量名，例如 "ytInitialData" 或 "ytInitialPlayerResponse"
+        
+    返回:
+        dict: 解析后的对象，未找到或解析失败时返回 None
+    """
+    markers = (f"var {name} = ", f'window["{name}"] = ', f"{name} = ")
+    for marker in markers:
+        index = html.find(marker)
+        while index != -1:
+            start = index + len(marker)
+            try:
+                data, _ = _decoder.raw_decode(html, start)
+                return data
+            except ValueError:
+                # 可能匹配到了字符串中的同名文本，继续查找下一处
+                index = html.find(marker, start)
+    return None
+
+
+def iter_values(data, target_key, descend=True):
+    """
+    单次迭代遍历嵌套数据，按先序顺序产出指定键对应的所有值
+    
+    使用显式栈代替递归，不会为每一层构建和合并新的列表，也不受递归深度限制。
+    同一列表中的元素按原有顺序产出；字典自身的匹配值先于其子节点中的匹配值产出。
+    
+    参数:
+        data: 嵌套的 dict/list 数据
+        target_key: 要查找的键
+        descend: 是否继续遍历匹配到的值内部。查找 renderer 这类不会嵌套自身的
+                 对象时设为 False，可以跳过大部分子树
+        
+    返回:
+        generator: 逐个产出匹配的值
+    """
+    stack = [data]
+    pop = stack.pop
+    append = stack.append
+    while stack:
+        node = pop()
+        if type(node) is dict:
+            if target_key in node:
+                yield node[target_key]
+                if not descend:
+                    node = [value for key, value in node.items() if key != target_key]
+                else:
+                    node = list(node.values())
+            else:
+                node = list(node.values())
+        elif type(node) is not list:
+            continue
+        # 逆序压栈，保证出栈顺序与原顺序一致
+        for value in reversed(node):
+            value_type = type(value)
+            if value_type is dict or value_type is list:
+                append(value)
+
+
+def iter_path(data, path):
+    """
+    按路径定向遍历嵌套数据，只访问路径上的节点
+    
+    参数:
+        data: 嵌套的 dict/list 数据
+        path: 路径元组，元素为字典键、列表下标，或 "*"（遍历列表的所有元素）
+        
+    返回:
+        generator: 产出路径末端的所有值，路径不存在的分支会被跳过
+    """
+    nodes = [data]
+    for step in path:
+        next_nodes = []
+        for node in nodes:
+            if step == "*":
+                if isinstance(node, list):
+                    next_nodes.extend(node)
+            elif isinstance(node, dict):
+                if step in node:
+                    next_nodes.append(node[step])
+            elif isinstance(node, list) and isinstance(step, int):
+                if -len(node) <= step < len(node):
+                    next_nodes.append(node[step])
+        nodes = next_nodes
+        if not nodes:
+            break
+    yield from nodes
+
+
+def get_path(data, path, default=None):
+    """
+    按路径获取嵌套数据中的单个值
+    
+    参数:
+        data: 嵌套的 dict/list 数据
+        path: 路径元组，元素为字典键、列表下标或 "*"
+        default: 路径不存在时返回的默认值
+        
+    返回:
+        路径末端的第一个值，不存在时返回 default
+    """
+    return next(iter_path(data, path), default)
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class MetadataCache:
+    """
+    视频和播放列表元数据的持久化缓存，基于 sqlite
+    
+    每条记录保存获取时间和服务器返回的 ETag/Last-Modified，
+    过期后可以用条件请求重新验证，未变化时无需重新下载和解析页面。
+    """
+    
+    def __init__(self, path, video_ttl=7 * 24 * 3600, playlist_ttl=6 * 3600, max_entries=50000):
+        """
+        初始化元数据缓存
+        
+        参数:
+            path: sqlite 数据库文件路径
+            video_ttl: 视频元数据的有效期（秒）
+            playlist_ttl: 播放列表内容的有效期（秒）
+            max_entries: 最大缓存条目数，超出后按最近访问时间淘汰
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.ttls = {
+            "video": video_ttl,
+            "playlist": playlist_ttl
+        }
+        self.max_entries = max_entries
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "revalidated": 0,
+            "evictions": 0
+        }
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+        # 维护条目数，写入时无需每次统计全表
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    
+    def get(self, kind, key):
+        """
+        读取缓存条目
+        
+        参数:
+            kind: 条目类型，'video' 或 'playlist'
+            key: 视频ID或播放列表ID
+            
+        返回:
+            dict: 包含 value、etag、last_modified、fresh 的字典，不存在时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, etag, last_modified, fetched_at FROM entries WHERE kind = ? AND key = ?",
+                (kind, key)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?",
+                (now, kind, key)
+            )
+            self._conn.commit()
+            
+            value, etag, last_modified, fetched_at = row
+            fresh = now - fetched_at < self.ttls.get(kind, 0)
+            self.stats["hits" if fresh else "stale"] += 1
+        
+        return {
+            "value": json.loads(value),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": fresh
+        }
+    
+    def put(self, kind, key, value, etag=None, last_modified=None):
+        """
+        写入缓存条目，超出容量时淘汰最久未访问的条目
+        
+        参数:
+            kind: 条目类型，'video' 或 'playlist'
+            key: 视频ID或播放列表ID
+            value: 可 JSON 序列化的值
+            etag: 响应的 ETag 头
+            last_modified: 响应的 Last-Modified 头
+        """
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (kind, key, value, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(value, ensure_ascii=False), etag, last_modified, now, now)
+            )
+            if not exists:
+                self._count += 1
+            
+            overflow = self._count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE rowid IN "
+                    "(SELECT rowid FROM entries ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self._count -= overflow
+                self.stats["evictions"] += overflow
+            self._conn.commit()
+    
+    def touch(self, kind, key):
+        """
+        条件请求返回 304 时调用，刷新条目的获取时间，使其重新有效
+        
+        参数:
+            kind: 条目类型，'video' 或 'playlist'
+            key: 视频ID或播放列表ID
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE kind = ? AND key = ?",
+                (now, now, kind, key)
+            )
+            self._conn.commit()
+            self.stats["revalidated"] += 1
+    
+    def validator_headers(self, entry):
+        """
+        根据缓存条目构建条件请求头
+        
+        参数:
+            entry: get 返回的缓存条目
+            
+        返回:
+            dict: If-None-Match / If-Modified-Since 请求头，条目没有验证信息时为空
+        """
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    def get_stats(self):
+        """
+        获取缓存统计信息
+        
+        返回:
+            dict: 命中、未命中、过期、重新验证、淘汰次数，以及当前条目数和命中率
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = self._count
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self):
+        """
+        清空所有缓存条目
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._count = 0
+    
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,48 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限速器，用于限制全局请求速率
+    """
+    
+    def __init__(self, rate, capacity=None):
+        """
+        初始化令牌桶
+        
+        参数:
+            rate: 每秒补充的令牌数，为 None 或 0 时不限速
+            capacity: 桶容量，即允许的最大突发请求数，默认与 rate 相同
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1, rate or 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens=1):
+        """
+        获取令牌，令牌不足时阻塞等待
+        
+        先预留令牌（允许余额为负），再在锁外等待补足，
+        这样并发调用者按到达顺序依次放行。
+        
+        参数:
+            tokens: 需要的令牌数
+            
+        返回:
+            float: 实际等待的秒数
+        """
+        if not self.rate:
+            return 0.0
+        
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -1,10 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api.formatters import TextFormatter, SRTFormatter
+from .rate_limiter import TokenBucket
 
 class SubtitleProcessor:
-    def __init__(self):
+    def __init__(self, cache=None, max_workers=4, requests_per_second=2):
+        """
+        初始化字幕处理器
+        
+        参数:
+            cache: 字幕缓存 TranscriptCache，为 None 时不使用缓存
+            max_workers: 批量获取字幕时的默认并发数
+            requests_per_second: 所有字幕请求共享的每秒请求数上限
+        """
         self.text_formatter = TextFormatter()
         self.srt_formatter = SRTFormatter()
+        self.cache = cache
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self._ytt_api = None
+        self._client_lock = threading.Lock()
+    
+    def _get_client(self):
+        """
+        获取共享的字幕客户端，所有请求复用同一个连接池
+        """
+        with self._client_lock:
+            if self._ytt_api is None:
+                http_client = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=max(self.max_workers, 1))
+                http_client.mount("https://", adapter)
+                http_client.mount("http://", adapter)
+                self._ytt_api = YouTubeTranscriptApi(http_client=http_client)
+            return self._ytt_api
+    
+    def _fetch_transcript(self, video_id, languages):
+        """
+        获取字幕原始数据，优先读取缓存，下载成功后写入缓存
+        """
+        if self.cache:
+            transcript = self.cache.get(video_id, languages)
+            if transcript is not None:
+                return transcript
+        
+        # 只有真正发起网络请求时才消耗限速令牌
+        self.rate_limiter.acquire()
+        fetched_transcript = self._get_client().fetch(video_id, languages=languages)
+        transcript = fetched_transcript.to_raw_data()
+        
+        if self.cache:
+            self.cache.put(video_id, languages, transcript)
+        return transcript
     
     def get_video_transcript(self, video_id, language='en'):
         """
@@ -18,9 +67,7 @@ class SubtitleProcessor:
             list: 字幕列表，每个元素包含text, start, duration
         """
         try:
-            ytt_api = YouTubeTranscriptApi()
-            fetched_transcript = ytt_api.fetch(video_id, languages=[language])
-            return fetched_transcript.to_raw_data()
+            return self._fetch_transcript(video_id, [language])
         except Exception as e:
             print(f"获取字幕失败: {e}")
             return None
@@ -37,13 +84,45 @@ class SubtitleProcessor:
             list: 字幕列表，每个元素包含text, start, duration
         """
         try:
-            ytt_api = YouTubeTranscriptApi()
-            fetched_transcript = ytt_api.fetch(video_id, languages=languages)
-            return fetched_transcript.to_raw_data()
+            return self._fetch_transcript(video_id, languages)
         except Exception as e:
             print(f"获取字幕失败: {e}")
             return None
     
+    def fetch_transcripts(self, video_ids, languages=['en', 'en-US'], max_workers=None):
+        """
+        并发获取多个视频的字幕，按完成顺序逐个产出结果
+        
+        所有请求复用同一个客户端，并受共享的令牌桶限速；每个视频仍按 languages
+        的优先级回退选择字幕语言。单个视频失败不会中断其他视频。
+        
+        参数:
+            video_ids: 视频ID列表
+            languages: 字幕语言列表，按优先级排序
+            max_workers: 最大并发数，默认使用初始化时设置的 max_workers
+            
+        返回:
+            generator: 逐个产出 (video_id, 字幕列表或异常对象)；提前关闭时取消尚未开始的请求
+        """
+        max_workers = max_workers or self.max_workers
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                executor.submit(self._fetch_transcript, video_id, languages): video_id
+                for video_id in video_ids
+            }
+            for future in as_completed(futures):
+                video_id = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"获取字幕失败 ({video_id}): {e}")
+                    result = e
+                yield video_id, result
+        finally:
+            # 生成器提前关闭时取消尚未开始的请求，不等待排队的视频
+            executor.shutdown(wait=False, cancel_futures=True)
+    
     def format_transcript_as_text(self, transcript):
         """
         将字幕格式化为纯文本
@@ -122,6 +201,8 @@ class SubtitleProcessor:
         """
         为每个字幕添加前后上下文，提高翻译质量
         
+        逐条带上下文翻译会重复发送上下文，按时间轴翻译整段字幕请使用 AITranslator.translate_transcript。
+        
         参数:
             transcript: 字幕列表
             context_window: 上下文窗口大小
@@ -0,0 +1,202 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 优先使用 zstd 压缩，未安装 zstandard 时退回 gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class TranscriptCache:
+    """
+    原始字幕的持久化缓存，压缩存储并按字节预算进行 LRU 淘汰
+    
+    以 (video_id, 语言优先级列表) 为键，重复翻译同一视频时无需重新下载字幕。
+    """
+    
+    def __init__(self, path, max_bytes=200 * 1024 * 1024, compression_level=3):
+        """
+        初始化字幕缓存
+        
+        参数:
+            path: sqlite 数据库文件路径
+            max_bytes: 压缩后数据的总字节预算，超出后淘汰最久未访问的条目
+            compression_level: 压缩级别
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self.codec = "zstd" if zstandard else "gzip"
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "bytes_read": 0,
+            "bytes_written": 0
+        }
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transcripts (
+                key TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_accessed ON transcripts (accessed_at)")
+        self._conn.commit()
+        # 维护条目数和总字节数，写入时无需每次统计全表
+        self._count, self._total_bytes, self._raw_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM transcripts"
+        ).fetchone()
+    
+    def _make_key(self, video_id, languages):
+        """
+        由视频ID和语言优先级列表构建缓存键，语言顺序有意义，不做排序
+        """
+        return json.dumps([video_id, list(languages)])
+    
+    def _compress(self, raw):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(raw)
+        return gzip.compress(raw, compresslevel=min(9, max(1, self.compression_level)))
+    
+    def _decompress(self, codec, data):
+        if codec == "zstd":
+            if not zstandard:
+                return None
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+    
+    def get(self, video_id, languages):
+        """
+        读取缓存的字幕
+        
+        参数:
+            video_id: 视频ID
+            languages: 字幕语言列表，按优先级排序
+            
+        返回:
+            list: 字幕列表，每个元素包含text, start, duration；未缓存时返回 None
+        """
+        key = self._make_key(video_id, languages)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT codec, data FROM transcripts WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            codec, data = row
+            raw = self._decompress(codec, data)
+            if raw is None:
+                # 使用当前环境无法解压的格式写入，视为未命中
+                self.stats["misses"] += 1
+                return None
+            
+            self._conn.execute(
+                "UPDATE transcripts SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.stats["hits"] += 1
+            self.stats["bytes_read"] += len(data)
+        
+        return json.loads(raw.decode("utf-8"))
+    
+    def put(self, video_id, languages, transcript):
+        """
+        压缩并写入字幕，超出字节预算时按最近访问时间淘汰旧条目
+        
+        参数:
+            video_id: 视频ID
+            languages: 字幕语言列表，按优先级排序
+            transcript: 字幕列表
+        """
+        key = self._make_key(video_id, languages)
+        raw = json.dumps(transcript, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        data = self._compress(raw)
+        if len(data) > self.max_bytes:
+            return
+        
+        with self._lock:
+            row = self._conn.execute("SELECT size, raw_size FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._total_bytes -= row[0]
+                self._raw_bytes -= row[1]
+            else:
+                self._count += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (key, codec, data, size, raw_size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.codec, data, len(data), len(raw), time.time())
+            )
+            self._total_bytes += len(data)
+            self._raw_bytes += len(raw)
+            self.stats["bytes_written"] += len(data)
+            
+            # 按最近访问时间从旧到新淘汰，直到满足字节预算；沿访问时间索引逐行读取，只读到够用为止
+            if self._total_bytes > self.max_bytes:
+                cursor = self._conn.execute(
+                    "SELECT key, size, raw_size FROM transcripts WHERE key != ? ORDER BY accessed_at", (key,)
+                )
+                evicted = []
+                for old_key, size, raw_size in cursor:
+                    evicted.append((old_key,))
+                    self._total_bytes -= size
+                    self._raw_bytes -= raw_size
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                cursor.close()
+                self._conn.executemany("DELETE FROM transcripts WHERE key = ?", evicted)
+                self._count -= len(evicted)
+                self.stats["evictions"] += len(evicted)
+            self._conn.commit()
+    
+    def get_stats(self):
+        """
+        获取缓存统计信息
+        
+        返回:
+            dict: 命中、未命中、淘汰次数，读写字节数，当前条目数、压缩后/原始总字节数和命中率
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = self._count
+            stats["bytes"] = self._total_bytes
+            stats["raw_bytes"] = self._raw_bytes
+            stats["codec"] = self.codec
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self):
+        """
+        清空所有缓存条目
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM transcripts")
+            self._conn.commit()
+            self._count = 0
+            self._total_bytes = 0
+            self._raw_bytes = 0
+    
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,83 @@
+from html.parser import HTMLParser
+
+# 视频观看页面中可提取的字段
+WATCH_FIELDS = ("title", "description", "publish_date")
+
+# 只会出现在 <head> 中的字段，</head> 之后仍未找到说明页面中没有
+HEAD_FIELDS = frozenset(["title", "description"])
+
+
+class _WatchMetadataParser(HTMLParser):
+    """
+    增量式HTML解析器，只关注 <title> 和少量 <meta> 标签
+    """
+    
+    def __init__(self, fields):
+        super().__init__(convert_charrefs=True)
+        self.fields = frozenset(fields)
+        self.values = {}
+        self.head_closed = False
+        self._in_title = False
+        self._title_parts = []
+    
+    @property
+    def done(self):
+        """
+        所需字段是否都已获取，或剩余字段已不可能再出现
+        """
+        missing = self.fields.difference(self.values)
+        if not missing:
+            return True
+        return self.head_closed and missing <= HEAD_FIELDS
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            if "title" not in self.values:
+                self._in_title = True
+            return
+        if tag != "meta":
+            return
+        
+        attrs = dict(attrs)
+        if attrs.get("property") == "og:description" and "description" not in self.values:
+            self.values["description"] = attrs.get("content") or ""
+        elif attrs.get("itemprop") == "datePublished" and "publish_date" not in self.values:
+            self.values["publish_date"] = attrs.get("content")
+    
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.values["title"] = "".join(self._title_parts).strip()
+        elif tag == "head":
+            self.head_closed = True
+    
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+
+def parse_watch_metadata(chunks, fields=WATCH_FIELDS, max_chars=None):
+    """
+    从视频观看页面的文本分块中提取标题、描述和发布日期
+    
+    边读取边解析，所需字段全部获取后（或只剩 <head> 内字段而 </head> 已出现时）
+    立即停止读取，不会下载和解析整个页面。
+    
+    参数:
+        chunks: 页面文本分块的可迭代对象
+        fields: 需要提取的字段，取值见 WATCH_FIELDS
+        max_chars: 最多读取的字符数，为 None 时不限制
+        
+    返回:
+        dict: 已找到的字段，未找到的字段不包含在结果中
+    """
+    parser = _WatchMetadataParser(fields)
+    read_chars = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        read_chars += len(chunk)
+        if parser.done or (max_chars and read_chars >= max_chars):
+            break
+    return {field: value for field, value in parser.values.items() if field in parser.fields}